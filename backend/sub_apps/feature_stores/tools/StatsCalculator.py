@@ -11,108 +11,327 @@ from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 import os, json
+import copy
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from time import monotonic
 from sqlalchemy import create_engine, text
 
 
+# --- JSON coercion for tool results ---
+# Rows carry datetimes and Decimals; results are coerced to plain JSON types in one
+# orjson encode/decode (datetimes are native there), the stdlib round trip is the fallback.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _serialize(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='ignore')
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _to_jsonable(result):
+    if orjson is not None:
+        return orjson.loads(orjson.dumps(result, default=_serialize, option=orjson.OPT_NON_STR_KEYS))
+    return json.loads(json.dumps(result, default=_serialize))
+
+
+# --- Shared database engine ---
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def _get_engine():
+    """One pooled engine per process, so tool calls don't reconnect to Postgres every time."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                pg_config = {
+                    'host': os.getenv("POSTGRES_HOST", 'xxx'),
+                    'port': os.getenv("POSTGRES_PORT", 8080),
+                    'user': os.getenv("POSTGRES_USER", 'xxx'),
+                    'password': os.getenv("POSTGRES_PASSWORD", 'xxx'),
+                    'db': os.getenv("POSTGRES_DB", 'xxx'),
+                    'sslmode': os.getenv("POSTGRES_SSLMODE", 'prefer')
+                }
+
+                if not all([pg_config['host'], pg_config['user'], pg_config['password'], pg_config['db']]):
+                    raise ValueError("Missing required database configuration")
+
+                # Create connection URL and engine
+                conn_url = (
+                    f"postgresql+psycopg2://{pg_config['user']}:{pg_config['password']}"
+                    f"@{pg_config['host']}:{pg_config['port']}/{pg_config['db']}"
+                    f"?sslmode={pg_config['sslmode']}"
+                )
+                _ENGINE = create_engine(conn_url, pool_pre_ping=True)
+    return _ENGINE
+
+
+# --- Table metadata catalog ---
+# Column metadata is cached per table and keyed by a DDL signature: the xmin of the table's
+# pg_class row and of its pg_attribute rows, which change on every ALTER/DROP/RENAME but not
+# on data writes. Checking the signature and reading the row estimate is one catalog lookup,
+# so metadata calls cost the same whatever the table size.
+
+_CATALOG_QUERY = text("""
+    SELECT
+      c.oid,
+      c.reltuples,
+      COALESCE(s.n_live_tup, 0) AS n_live_tup,
+      c.xmin::text || ':' || (
+        SELECT string_agg(a.xmin::text, ',' ORDER BY a.attnum)
+        FROM pg_attribute a
+        WHERE a.attrelid = c.oid AND a.attnum > 0
+      ) AS ddl_signature
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE n.nspname = :schema AND c.relname = :table AND c.relkind IN ('r', 'p', 'v', 'm')
+""")
+
+_COLUMNS_QUERY = text("""
+    SELECT column_name, data_type, is_nullable
+    FROM information_schema.columns
+    WHERE table_schema = :schema AND table_name = :table
+    ORDER BY ordinal_position
+""")
+
+_column_cache: Dict[Tuple[str, str], Tuple[str, List[dict]]] = {}
+_column_cache_lock = threading.Lock()
+
+
+def _split_table_name(table: str, default_schema: str = "public") -> Tuple[str, str]:
+    parts = [p.strip().strip('"') for p in table.split(".")]
+    if len(parts) == 1 and parts[0]:
+        return default_schema, parts[0]
+    if len(parts) == 2 and all(parts):
+        return parts[0], parts[1]
+    raise ValueError(f"table must be 'table' or 'schema.table', got: {table}")
+
+
+def _quote_table(schema: str, table: str) -> str:
+    return '"{}"."{}"'.format(schema.replace('"', '""'), table.replace('"', '""'))
+
+
+def describe_table(conn, schema: str, table: str) -> dict:
+    """
+    Row estimate and column metadata for `schema.table`, columns served from the cache
+    while the table's DDL signature is unchanged.
+    """
+    entry = conn.execute(_CATALOG_QUERY, {"schema": schema, "table": table}).mappings().first()
+    if entry is None:
+        raise ValueError(f"Table {schema}.{table} not found")
+
+    key = (schema, table)
+    cached = _column_cache.get(key)
+    if cached is not None and cached[0] == entry["ddl_signature"]:
+        columns = cached[1]
+    else:
+        columns = [dict(col) for col in conn.execute(_COLUMNS_QUERY, {"schema": schema, "table": table}).mappings().all()]
+        with _column_cache_lock:
+            _column_cache[key] = (entry["ddl_signature"], columns)
+
+    # reltuples is -1 (or 0) until the first VACUUM/ANALYZE; the stats collector's
+    # live-tuple counter covers that window
+    estimate = entry["reltuples"] if entry["reltuples"] > 0 else entry["n_live_tup"]
+    return {"oid": entry["oid"], "estimated_count": int(estimate), "columns": columns}
+
+
+# --- Tool result cache ---
+# Agents repeat the same tool call within a conversation. Results are cached per normalized
+# arguments for TOOL_CACHE_TTL_SECONDS, at most TOOL_CACHE_MAX_ENTRIES entries (LRU), and
+# tagged with a version of every table the call reads: pg_stat_user_tables write counters,
+# analyze counters (row estimates) and the pg_class row's xmin (DDL). A hit costs one
+# catalog lookup; a changed version is a miss and the call runs again.
+
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "256"))
+
+_TABLE_VERSION_QUERY = text("""
+    SELECT
+      c.xmin::text || ':' || COALESCE(s.n_tup_ins + s.n_tup_upd + s.n_tup_del, 0)::text
+        || ':' || COALESCE(s.analyze_count + s.autoanalyze_count, 0)::text AS version
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE n.nspname = :schema AND c.relname = :table
+""")
+
+
+class _ToolResultCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, tuple, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "evictions": 0}
+
+    def get(self, key: str, version: tuple) -> Optional[dict]:
+        now = monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            expires_at, cached_version, value = entry
+            if expires_at <= now or cached_version != version:
+                del self._entries[key]
+                self.counters["expired" if expires_at <= now else "invalidated"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def put(self, key: str, version: tuple, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl_seconds, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else None,
+                # Every hit is one tool query that never reached Postgres
+                "queries_saved": self.counters["hits"],
+            }
+
+
+_tool_cache = _ToolResultCache(TOOL_CACHE_TTL_SECONDS, TOOL_CACHE_MAX_ENTRIES)
+
+
+def _normalize_argument(value):
+    # "a, b,c" and "a,b,c" are the same column list
+    if isinstance(value, str):
+        return ",".join(part.strip() for part in value.strip().split(","))
+    if isinstance(value, (list, tuple)):
+        return [_normalize_argument(v) for v in value]
+    return value
+
+
+def _cached_tool(tables):
+    """
+    Cache a tool's result. `tables(arguments)` names the "schema.table"s the call reads,
+    given the bound arguments with defaults applied.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: _normalize_argument(v) for k, v in bound.arguments.items()}
+            key = fn.__name__ + ":" + json.dumps(arguments, sort_keys=True, default=str)
+
+            with _get_engine().connect() as conn:
+                version = tuple(
+                    conn.execute(_TABLE_VERSION_QUERY, dict(zip(("schema", "table"), _split_table_name(t)))).scalar()
+                    for t in tables(arguments)
+                )
+            cached = _tool_cache.get(key, version)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+            result = fn(*args, **kwargs)
+            _tool_cache.put(key, version, copy.deepcopy(result))
+            return result
+        return wrapper
+    return decorator
+
+
+@tool
+def get_tool_cache_stats() -> dict:
+    """
+    Returns hit/miss counters of the tool result cache, to see how many repeated tool calls were answered without querying the database.
+
+    Returns:
+        dict: entries, hits, misses, expired, invalidated (table changed), evictions, hit_rate and queries_saved
+    """
+    return _tool_cache.stats()
+
+
 @tool
-def get_metadata(nlimit: int = 1) -> dict:
+@_cached_tool(lambda args: [args["table"]])
+def get_metadata(nlimit: int = 1, table: str = "public.sample_datasets", exact_count: bool = False) -> dict:
     """
     Returns metadata and sample data for a PostgreSQL table.
     
     Args:
-        schema: Database schema name (default: "public")
-        table_name: Name of the table to query (default: "sample_datasets")
+        nlimit: Number of sample rows to return (default: 1)
+        table: Table to describe, as "schema.table" or "table" in the public schema (default: "public.sample_datasets")
+        exact_count: Count rows exactly instead of using the planner's estimate. Exact counts scan the whole table, only use when the user asks for an exact number (default: False)
     
     Returns:
-        dict: Contains count, columns metadata, and one sample row
+        dict: Contains count (estimated unless exact_count), columns metadata, and sample rows
     """
-    # Custom JSON serializer
-    def serialize(obj):
-        if isinstance(obj, (datetime, date, time)):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, bytes):
-            return obj.decode('utf-8', errors='ignore')
-        raise TypeError(f"Type {type(obj)} not serializable")
-    
-    schema = "public"
-    table_name = "sample_datasets"
-
-    # load_dotenv()s
-    # Get and validate environment variables
-    # pg_config = {
-    #     'host': os.getenv("POSTGRES_HOST"),
-    #     'port': os.getenv("POSTGRES_PORT"),
-    #     'user': os.getenv("POSTGRES_USER"),
-    #     'password': os.getenv("POSTGRES_PASSWORD"),
-    #     'db': os.getenv("POSTGRES_DB"),
-    #     'sslmode': os.getenv("POSTGRES_SSLMODE", "prefer")
-    # }
-    pg_config = {
-        'host': 'xxx',
-        'port': 8080,
-        'user': 'xxx',
-        'password': 'xxx',
-        'db': 'xxx',
-        'sslmode': 'prefer'
-    }
-    
-    if not all([pg_config['host'], pg_config['user'], pg_config['password'], pg_config['db']]):
-        raise ValueError("Missing required environment variables: POSTGRES_HOST, POSTGRES_USER, POSTGRES_PASSWORD, or POSTGRES_DB")
-    
-    # Create connection URL and engine
-    conn_url = (
-        f"postgresql+psycopg2://{pg_config['user']}:{pg_config['password']}"
-        f"@{pg_config['host']}:{pg_config['port']}/{pg_config['db']}"
-        f"?sslmode={pg_config['sslmode']}"
-    )
-    engine = create_engine(conn_url, pool_pre_ping=True)
+    schema, table_name = _split_table_name(table)
+    engine = _get_engine()
     
     # Execute queries
     with engine.connect() as conn:
-        count_result = conn.execute(
-            text(f'SELECT COUNT(*) AS n FROM {schema}.{table_name}')
-        ).mappings().first()
+        # Also validates the table, so the quoted name below is known to exist
+        described = describe_table(conn, schema, table_name)
+        qualified = _quote_table(schema, table_name)
+
+        count = described["estimated_count"]
+        if exact_count:
+            count = conn.execute(text(f'SELECT COUNT(*) AS n FROM {qualified}')).mappings().first()["n"]
         
         sample_row = conn.execute(
-            text(f'SELECT * FROM {schema}.{table_name} LIMIT :limit'),
+            text(f'SELECT * FROM {qualified} LIMIT :limit'),
             {"limit": nlimit}
         ).mappings().all()
-        
-        columns = conn.execute(
-            text("""
-                SELECT column_name, data_type, is_nullable
-                FROM information_schema.columns
-                WHERE table_schema = :schema AND table_name = :table
-                ORDER BY ordinal_position
-            """),
-            {"schema": schema, "table": table_name}
-        ).mappings().all()
     
     # Build and return result
     result = {
         "schema": schema,
         "table": table_name,
-        "count": count_result["n"],
-        "columns": [dict(col) for col in columns],
+        "count": count,
+        "count_estimated": not exact_count,
+        "columns": described["columns"],
         "rows": [{k: v for k, v in row.items()} for row in sample_row]
     }
     
-    return json.loads(json.dumps(result, default=serialize))
+    return _to_jsonable(result)
 
 
 @tool
-def get_column_data_v2(column_selected, host_id="", gap_days: int = 2) -> dict:
+@_cached_tool(lambda args: ["public.sample_datasets"])
+def get_column_data_v2(column_selected, host_id="", gap_days: int = 2, gap_days_list: str = "", limit: int = 20, offset: int = 0, cursor: str = "") -> dict:
     """
     Performs a feature engineering that uses on sample_datasets, create average value metrics between two datetime points separated by a specified number of days. Show 10-20 rows of results in table format.
 
-    Datasets only have 'datetime', 'hostname', 'core_number_avg', 'cpu_usage_percentage_avg', 'memory_number_avg', 'memory_usage_percentage_avg' columns.  
+    Results only have 'hostname', 'host_id', 'datetime_1', 'gap_days', 'datetime_2', 'core_number_avg', 'cpu_usage_percentage_avg', 'memory_number_avg', 'memory_usage_percentage_avg' columns.
+    Dataset column names are accepted too: 'datetime' maps to 'datetime_1' and a metric such as 'cpu_usage_percentage' to 'cpu_usage_percentage_avg'.
 
     Args:
-        column_selected: Comma-separated column names string. All the data included data_index, data_target, and data_feature (default: 'hostname', 'datetime', 'core_number', 'cpu_usage_percentage', 'memory_number', 'memory_usage_percentage')
+        column_selected: Comma-separated column names string. All the data included data_index, data_target, and data_feature (default: 'hostname', 'host_id', 'datetime_1', 'gap_days', 'datetime_2', 'core_number_avg', 'cpu_usage_percentage_avg', 'memory_number_avg', 'memory_usage_percentage_avg')
         host_id: Specific host_id to filter (e.g., "5"). If empty string, returns all hosts (default: "")
         gap_days: Number of days between comparison points (default: 2)
+        gap_days_list: Comma-separated gap sizes computed together in one pass, e.g. "2,5,7". Overrides gap_days; each result row then carries its own gap_days value (default: "")
+        limit: Rows to return, at most 200 (default: 20)
+        offset: Rows to skip before returning, after the cursor position if one is given (default: 0)
+        cursor: The next_cursor value of a previous call, to fetch the following page of the same query (default: "")
 
         Example:
         'data index choose hostname 1; data target is cpu usage percentage; data features only use memory usage percentage; gap days is 5'
@@ -122,46 +341,20 @@ def get_column_data_v2(column_selected, host_id="", gap_days: int = 2) -> dict:
         column_selected = ["hostname", "host_id", "datetime_1", "datetime_2", "cpu_usage_percentage_avg", "memory_usage_percentage_avg"]
 
         {"column_selected":"hostname,host_id,datetime_1,datetime_2,cpu_usage_percentage_avg,memory_usage_percentage_avg","host_id":"5","gap_days":2}
+        {"column_selected":"hostname,datetime_1,gap_days,datetime_2,cpu_usage_percentage_avg","host_id":"","gap_days_list":"1,7,14"}
+        {"column_selected":"hostname,datetime_1,datetime_2,cpu_usage_percentage_avg","host_id":"5","gap_days":2,"cursor":"<next_cursor from the previous answer>"}
         
     
     Returns:
-        dict: Contains query metadata and result rows with averaged metrics
+        dict: Contains query metadata, result rows with averaged metrics, the total row_count and
+        a next_cursor for the following page (null on the last page)
     """
-    from datetime import datetime, date, time
-    from decimal import Decimal
+    import base64
+    import hashlib
     import json
-    from sqlalchemy import create_engine, text
+    from sqlalchemy import text
     
-    # Custom JSON serializer
-    def serialize(obj):
-        if isinstance(obj, (datetime, date, time)):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, bytes):
-            return obj.decode('utf-8', errors='ignore')
-        raise TypeError(f"Type {type(obj)} not serializable")
-    
-    # Database configuration
-    pg_config = {
-        'host': 'xxx',
-        'port': 8080,
-        'user': 'xxx',
-        'password': 'xxx',
-        'db': 'xxx',
-        'sslmode': 'prefer'
-    }
-    
-    if not all([pg_config['host'], pg_config['user'], pg_config['password'], pg_config['db']]):
-        raise ValueError("Missing required database configuration")
-    
-    # Create connection URL and engine
-    conn_url = (
-        f"postgresql+psycopg2://{pg_config['user']}:{pg_config['password']}"
-        f"@{pg_config['host']}:{pg_config['port']}/{pg_config['db']}"
-        f"?sslmode={pg_config['sslmode']}"
-    )
-    engine = create_engine(conn_url, pool_pre_ping=True)
+    engine = _get_engine()
     
     # Convert host_id to integer or None
     filter_host_id = None
@@ -171,70 +364,167 @@ def get_column_data_v2(column_selected, host_id="", gap_days: int = 2) -> dict:
         except ValueError:
             raise ValueError(f"host_id must be a valid integer, got: {host_id}")
     
+    # Gap sizes: a list computes every gap in the same scan
+    gap_source = gap_days_list if str(gap_days_list).strip() else str(gap_days)
+    try:
+        gaps = sorted({int(g.strip()) for g in gap_source.split(",") if g.strip()})
+    except ValueError:
+        raise ValueError(f"gap_days must be integers, got: {gap_source}")
+    if not gaps or any(g < 0 for g in gaps):
+        raise ValueError(f"gap_days must be integers >= 0, got: {gap_source}")
+
+    metrics = ["core_number", "cpu_usage_percentage", "memory_number", "memory_usage_percentage"]
+    output_columns = ["hostname", "host_id", "datetime_1", "gap_days", "datetime_2"] + [f"{col}_avg" for col in metrics]
+    # Dataset column names map to the output column derived from them
+    aliases = {"datetime": "datetime_1", **{col: f"{col}_avg" for col in metrics}}
+
+    # Column projection: only requested outputs are selected, and only their windows computed
+    if isinstance(column_selected, str):
+        fields = [c.strip() for c in column_selected.split(",") if c.strip()]
+    else:
+        fields = list(column_selected)
+    fields = list(dict.fromkeys(aliases.get(f, f) for f in fields))
+    unknown = [f for f in fields if f not in output_columns]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}; available columns: {', '.join(output_columns)}")
+    fields = fields or output_columns
+    used_metrics = [col for col in metrics if f"{col}_avg" in fields]
+    partner_names = (["datetime"] if "datetime_2" in fields else []) + used_metrics
+
+    limit = max(1, min(int(limit), 200))
+    offset = max(0, int(offset))
+
+    # Paging is keyset-based on (host_id, datetime_1, hostname, gap_days). The cursor carries the
+    # last row's key and a fingerprint of the filters, so it can't be replayed on another query
+    fingerprint = hashlib.sha1(json.dumps([gaps, filter_host_id]).encode()).hexdigest()[:12]
+    after = None
+    if cursor and cursor.strip():
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor.strip().encode()))
+        except Exception:
+            raise ValueError("cursor is not a valid next_cursor value")
+        if token.get("q") != fingerprint:
+            raise ValueError("cursor belongs to a query with different host_id or gap_days, start again without a cursor")
+        after = token
+
+    # One ordered scan per host: for each gap, a RANGE frame holding exactly the rows at
+    # "datetime" + gap days reads the partner row, replacing the former self-join.
+    # Gaps are validated integers, so they are inlined (frame offsets must be constants).
+    # Hostnames without a number share the NULL host_id partition; as in the self-join,
+    # which never matched NULL = NULL, they get no partner.
+    window_defs = ",\n          ".join(
+        f"""w{g} AS (PARTITION BY host_id ORDER BY "datetime" """
+        f"""RANGE BETWEEN INTERVAL '{g} days' FOLLOWING AND INTERVAL '{g} days' FOLLOWING)"""
+        for g in gaps
+    )
+    partner_cols = "".join(
+        f',\n            CASE WHEN host_id IS NOT NULL THEN first_value("{name}") OVER w{g} END AS {name}_{g}'
+        for g in gaps for name in partner_names
+    )
+    gap_rows = ",\n            ".join(
+        "(" + ", ".join([str(g)] + [f"{name}_{g}" for name in partner_names]) + ")"
+        for g in gaps
+    )
+    gap_cols = ", ".join(["gap_days"] + [f"{name}_2" for name in partner_names])
+    select_cols = ",\n          ".join(
+        ['w.hostname', 'w.host_id', 'w."datetime" AS datetime_1', 'g.gap_days']
+        + (['g.datetime_2'] if "datetime_2" in fields else [])
+        + [f"(w.{col} + g.{col}_2) / 2.0 AS {col}_avg" for col in used_metrics]
+    )
+
+    # host_id is a stored generated column indexed with "datetime" (see table_schema.yaml):
+    # a single-host filter is an index range scan already in window order
+    conditions, params = [], {"limit": limit + 1, "offset": offset}
+    if filter_host_id is not None:
+        conditions.append("host_id = :filter_host_id")
+        params["filter_host_id"] = filter_host_id
+    page_filter = ""
+    if after is not None:
+        # Partner rows lie ahead in time, so rows before the cursor can be skipped before windowing.
+        # NULL host_id rows sort last and a row comparison against NULL is never true, so they are
+        # matched separately; hostname breaks ties between hosts sharing a host_id (or none)
+        params.update(after_host_id=after["h"], after_datetime=after["d"], after_hostname=after.get("n", ""), after_gap=after["g"])
+        after_page = '(w."datetime", COALESCE(w.hostname, \'\'), g.gap_days) > (CAST(:after_datetime AS TIMESTAMP), :after_hostname, :after_gap)'
+        if after["h"] is None:
+            conditions.append('host_id IS NULL AND "datetime" >= CAST(:after_datetime AS TIMESTAMP)')
+            page_filter = f"WHERE w.host_id IS NULL AND {after_page}"
+        else:
+            conditions.append('(host_id IS NULL OR (host_id, "datetime") >= (:after_host_id, CAST(:after_datetime AS TIMESTAMP)))')
+            page_filter = (
+                f"WHERE (w.host_id IS NULL OR w.host_id > :after_host_id "
+                f"OR (w.host_id = :after_host_id AND {after_page}))"
+            )
+    host_filter = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
     # Gap analysis query with optional host_id filter
-    query = text("""
-        WITH params AS (
-          SELECT 
-            CAST(:gap_days AS INTEGER) AS gap_days,
-            CAST(:filter_host_id AS INTEGER) AS filter_host_id
-        ),
-        base AS (
+    query = text(f"""
+        WITH filtered_base AS (
           SELECT
             hostname,
-            (regexp_match(trim(hostname), '(\d+)'))[1]::int AS host_id,
+            host_id,
             "datetime",
             core_number,
             cpu_usage_percentage,
             memory_number,
             memory_usage_percentage
           FROM public.sample_datasets
+          {host_filter}
         ),
-        filtered_base AS (
-          SELECT * 
-          FROM base
-          WHERE (SELECT filter_host_id FROM params) IS NULL 
-             OR host_id = (SELECT filter_host_id FROM params)
+        windowed AS (
+          SELECT
+            b.*{partner_cols}
+          FROM filtered_base b
+          WINDOW
+          {window_defs}
         )
         SELECT
-          b1.hostname,
-          b1.host_id,
-          b1."datetime" AS datetime_1,
-          b2."datetime" AS datetime_2,
-          (b1.core_number + b2.core_number) / 2.0 AS core_number_avg,
-          (b1.cpu_usage_percentage + b2.cpu_usage_percentage) / 2.0 AS cpu_usage_percentage_avg,
-          (b1.memory_number + b2.memory_number) / 2.0 AS memory_number_avg,
-          (b1.memory_usage_percentage + b2.memory_usage_percentage) / 2.0 AS memory_usage_percentage_avg
-        FROM filtered_base b1
-        JOIN params p ON true
-        LEFT JOIN filtered_base b2
-          ON b2.host_id = b1.host_id
-         AND b2."datetime" = b1."datetime" + make_interval(days => p.gap_days)
+          {select_cols}
+        FROM windowed w
+        CROSS JOIN LATERAL (VALUES
+            {gap_rows}
+        ) AS g({gap_cols})
+        {page_filter}
         ORDER BY
-          b1.host_id ASC,
-          b1."datetime" ASC
+          w.host_id ASC NULLS LAST,
+          w."datetime" ASC,
+          COALESCE(w.hostname, '') ASC,
+          g.gap_days ASC
+        LIMIT :limit OFFSET :offset
     """)
-    
-    # Execute query with parameters
+
+    # Every base row yields one output row per gap, so the total is a plain row count:
+    # exact through the index for one host, the catalog estimate for the whole table
     with engine.connect() as conn:
-        result_rows = conn.execute(query, {
-            "gap_days": gap_days,
-            "filter_host_id": filter_host_id  # None for all hosts, or specific integer
-        }).mappings().all()
+        result_rows = conn.execute(query, params).mappings().all()
+        if filter_host_id is not None:
+            base_count = conn.execute(
+                text("SELECT COUNT(*) AS n FROM public.sample_datasets WHERE host_id = :filter_host_id"),
+                {"filter_host_id": filter_host_id}
+            ).mappings().first()["n"]
+        else:
+            base_count = describe_table(conn, "public", "sample_datasets")["estimated_count"]
     
-    # Filter columns based on column_selected
-    if isinstance(column_selected, str):
-        fields = [c.strip() for c in column_selected.split(",") if c.strip()]
-    else:
-        fields = list(column_selected)
-    rows_filtered = [{k: row.get(k) for k in fields} for row in result_rows]
+    page = result_rows[:limit]
+    next_cursor = None
+    if len(result_rows) > limit:
+        last = page[-1]
+        token = {
+            "h": last["host_id"], "d": last["datetime_1"].isoformat(), "n": last["hostname"] or "",
+            "g": last["gap_days"], "q": fingerprint
+        }
+        next_cursor = base64.urlsafe_b64encode(json.dumps(token).encode()).decode()
+    rows_filtered = [{k: row.get(k) for k in fields} for row in page]
 
     # Build and return result
     result = {
         "query_type": "gap_analysis",
-        "gap_days": gap_days,
+        "gap_days": gaps[0] if len(gaps) == 1 else gaps,
         "host_id_filter": host_id if host_id else "all",
-        "row_count": len(result_rows),
-        "rows": rows_filtered[:20]  # limit to first 20 rows for brevity
+        "row_count": int(base_count) * len(gaps),
+        "row_count_estimated": filter_host_id is None,
+        "limit": limit,
+        "rows": rows_filtered,
+        "next_cursor": next_cursor
     }
     
-    return json.loads(json.dumps(result, default=serialize))
\ No newline at end of file
+    return _to_jsonable(result)
@@ -1,8 +1,8 @@
 from pathlib import Path
 import yaml
-from sqlalchemy import create_engine, MetaData, Table, Column, String, DateTime, text
+from sqlalchemy import create_engine, MetaData, Table, Column, String, DateTime, text, Computed, Index
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import String, Integer, Float, Date
+from sqlalchemy import String, Integer, BigInteger, Float, Date
 from dotenv import load_dotenv
 import os
 
@@ -33,8 +33,10 @@ TYPE_MAP = {
     "string": String,
     "integer": Integer,
     "int": Integer,
+    "bigint": BigInteger,
     "float": Float,
     "date": Date,
+    "timestamp": DateTime,
     "jsonb": JSONB,
     "timestamptz": DateTime(timezone=True),
 }
@@ -62,6 +64,11 @@ def build_metadata(schema: dict) -> MetaData:
 
             sqlalchemy_type = TYPE_MAP[col_type]
             kwargs = {}
+            args = []
+
+            # Stored generated column, computed by Postgres on write
+            if col.get("generated"):
+                args.append(Computed(text(col["generated"]), persisted=True))
 
             # Default value handling
             if default is not None and str(default).lower() != "null":
@@ -73,19 +80,68 @@ def build_metadata(schema: dict) -> MetaData:
                     else:
                         kwargs["server_default"] = text(str(default))
 
-            columns.append(Column(col_name, sqlalchemy_type, **kwargs))
+            columns.append(Column(col_name, sqlalchemy_type, *args, **kwargs))
+
+        table = Table(table_name, metadata, *columns)
+        table.info["keep_data"] = bool(table_def.get("keep_data"))
 
-        Table(table_name, metadata, *columns)
+        for index_def in table_def.get("indexes", []):
+            Index(index_def["name"], *[table.c[c] for c in index_def["columns"]])
 
     return metadata
 
 
+def upgrade_kept_tables(schema: dict):
+    """
+    Bring existing `keep_data` tables up to the YAML schema without dropping them:
+    add missing generated columns (Postgres backfills stored values) and indexes.
+
+    Adding a STORED generated column rewrites the whole table under an ACCESS EXCLUSIVE
+    lock, blocking reads and writes until it finishes, so run the first upgrade of a
+    large table in a maintenance window; once the column exists this step is a no-op.
+    Indexes are built with CREATE INDEX CONCURRENTLY, outside any transaction, so
+    writes continue while they build.
+    """
+    kept = [t for t in schema.get("tables", []) if t.get("keep_data")]
+
+    for table_def in kept:
+        table_name = table_def["table_name"]
+        generated = [col for col in table_def["columns"] if col.get("generated")]
+        if not generated:
+            continue
+        # One short transaction per table, so a rewrite never holds locks on other tables
+        with engine.begin() as conn:
+            for col in generated:
+                conn.execute(text(
+                    f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "{col["name"]}" '
+                    f'{col["type"]} GENERATED ALWAYS AS ({col["generated"]}) STORED'
+                ))
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table_def in kept:
+            table_name = table_def["table_name"]
+            for index_def in table_def.get("indexes", []):
+                # A failed concurrent build leaves an invalid index that IF NOT EXISTS would keep
+                invalid = conn.execute(text(
+                    "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name"
+                ), {"name": index_def["name"]}).scalar()
+                if invalid:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index_def["name"]}'))
+                cols = ", ".join(f'"{c}"' for c in index_def["columns"])
+                conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_def["name"]} ON {table_name} ({cols})'))
+            conn.execute(text(f"ANALYZE {table_name}"))
+
+
 def recreate_tables(path):
     schema = load_yaml_schema(path)
     metadata = build_metadata(schema)
+    recreated = [t for t in metadata.sorted_tables if not t.info["keep_data"]]
 
     print("Dropping & creating tables from YAML schema...")
-    metadata.drop_all(bind=engine)
+    metadata.drop_all(bind=engine, tables=recreated)
+    # Kept tables are only created when missing
     metadata.create_all(bind=engine)
+    upgrade_kept_tables(schema)
     print("DONE.")
 
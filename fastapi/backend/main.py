@@ -8,11 +8,23 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 import uuid
 import random
+from contextlib import asynccontextmanager
 
 # Import Service Layer
 from backend.services import data_service
+from backend.services.serialization import FastJSONResponse
 
-app = FastAPI(title="ML Lifecycle API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background work runs in the one process with SCHEDULER_ENABLED, not in every worker
+    if data_service.SCHEDULER_ENABLED:
+        # Uploads queued by a previous process would otherwise stay pending forever
+        data_service.resume_pending_uploads()
+        data_service.scheduler.start()
+    yield
+    data_service.scheduler.stop()
+
+app = FastAPI(title="ML Lifecycle API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -58,23 +70,73 @@ class Model(BaseModel):
     dataset_id: str = Field(..., example="d-123")
     task_type: str = Field(..., example="classification")
     target_column: str = Field(..., example="default_flag")
-    metrics: Dict[str, float] = Field(..., example={"accuracy": 0.85, "f1": 0.82})
+    metrics: Dict[str, Any] = Field(..., example={"accuracy": 0.85, "f1": 0.82})
     cos_path: Optional[str] = Field(None, example="cos://bucket/key")
+    upload_state: Optional[str] = Field(None, example="uploaded")  # 'pending', 'uploaded' or 'failed'
+    upload_error: Optional[str] = Field(None, example=None)
+    parent_model_id: Optional[str] = Field(None, example="m-122")
+    rows_added: Optional[int] = Field(None, example=5000)
+
+class HyperparameterSearchConfig(BaseModel):
+    mode: str = Field("random", example="halving")  # 'random' or 'halving'
+    param_space: Optional[Dict[str, Any]] = Field(None, example={"max_depth": {"type": "int", "low": 3, "high": 10}, "learning_rate": [0.05, 0.1, 0.2]})
+    n_trials: int = Field(20, example=27)
+    max_estimators: int = Field(500, example=500)
+    early_stopping_rounds: int = Field(20, example=20)
+    eta: int = Field(3, example=3)
+    validation_size: float = Field(0.2, example=0.2)
+    n_jobs: int = Field(-1, example=-1)
+
+class BacktestConfig(BaseModel):
+    n_splits: int = Field(5, example=5)
+    window: str = Field("expanding", example="sliding")  # 'expanding' or 'sliding'
+    train_periods: Optional[int] = Field(None, example=60)  # distinct dates per training window (sliding only)
+    test_periods: Optional[int] = Field(None, example=7)
+    gap_periods: int = Field(0, example=21)
+    n_jobs: int = Field(-1, example=-1)
+
+class FastPathConfig(BaseModel):
+    mode: str = Field("in_memory", example="external_memory")  # 'in_memory' or 'external_memory'
+    nthread: Optional[int] = Field(None, example=8)
+    max_bin: int = Field(256, example=256)
+    chunk_size: int = Field(100000, example=100000)  # rows per read in external_memory mode
+
+class FanOutConfig(BaseModel):
+    group_by: List[str] = Field(["Type", "Application"], example=["IP"])
+    min_group_rows: int = Field(50, example=50)  # smaller groups are served by the fallback model
+    n_jobs: int = Field(-1, example=-1)
 
 class TrainRequest(BaseModel):
     dataset_id: str = Field(..., example="d-123")
     selection_id: str = Field(..., example="fs-run-123")
     project_id: str = Field(..., example="p1")
     task_type: str = Field(..., example="classification")
+    search: Optional[HyperparameterSearchConfig] = None
+    backtest: Optional[BacktestConfig] = None
+    fast_path: Optional[FastPathConfig] = None
+    fan_out: Optional[FanOutConfig] = None
+
+class SamplingConfig(BaseModel):
+    mode: str = Field("stratified", example="reservoir")  # 'stratified' or 'reservoir'
+    size: int = Field(200000, example=200000)  # target sample rows
+    group_by: Optional[List[str]] = Field(None, example=["Type", "Application", "IP"])  # strata, defaults to the device key
+    confidence: float = Field(0.95, example=0.95)
+    seed: int = Field(42, example=42)
 
 class FeatureSelectionRequest(BaseModel):
     target_column: str = Field(..., example="Value_Next_7D")
     top_k: int = Field(10, example=10)
+    strategy: str = Field("correlation", example="mrmr")  # correlation, mutual_info, mrmr or model_importance
+    sample: Optional[SamplingConfig] = None
 
 class FeatureSelectionResponse(BaseModel):
     selection_id: str = Field(..., example="fs-run-123")
+    strategy: str = Field("correlation", example="mrmr")
     selected_features: List[str] = Field(..., example=["feature1", "feature2"])
     dropped_features: List[Dict[str, str]] = Field(..., example=[{"name": "feat3", "reason": "low variance"}])
+    scores: Dict[str, Optional[float]] = Field({}, example={"feature1": 0.42, "feature2": 0.31})
+    sample: Optional[Dict[str, Any]] = Field(None, example={"mode": "stratified", "rows": 200000, "population_rows": 50000000, "confidence": 0.95})
+    confidence_intervals: Optional[Dict[str, Optional[Dict[str, Any]]]] = Field(None, example={"feature1": {"r": 0.42, "low": 0.41, "high": 0.43, "n": 200000}})
 
 class FeatureEngineeringResponse(BaseModel):
     status: str = Field(..., example="success")
@@ -127,7 +189,7 @@ def feature_engineer(project_id: str, dataset_id: str):
 
 @app.post("/projects/{project_id}/datasets/{dataset_id}/feature-select", response_model=FeatureSelectionResponse)
 def feature_select(project_id: str, dataset_id: str, req: FeatureSelectionRequest):
-    return data_service.run_feature_selection(dataset_id, project_id, req.target_column, req.top_k)
+    return data_service.run_feature_selection(dataset_id, project_id, req.target_column, req.top_k, req.strategy, req.sample.model_dump() if req.sample else None)
 
 @app.get("/projects/{project_id}/models", response_model=List[Model])
 def list_models_endpoint(project_id: str):
@@ -136,13 +198,33 @@ def list_models_endpoint(project_id: str):
 @app.post("/projects/{project_id}/models/train")
 def train_model_postgres(project_id: str, req: TrainRequest):
     try:
-        return data_service.train_model(req.dataset_id, req.selection_id, req.project_id, req.task_type)
+        search = req.search.model_dump() if req.search else None
+        backtest = req.backtest.model_dump() if req.backtest else None
+        fast_path = req.fast_path.model_dump() if req.fast_path else None
+        fan_out = req.fan_out.model_dump() if req.fan_out else None
+        # Untyped payload (metrics, trials, backtest folds): encoded directly, skipping jsonable_encoder
+        return FastJSONResponse(data_service.train_model(req.dataset_id, req.selection_id, req.project_id, req.task_type, search=search, backtest=backtest, fast_path=fast_path, fan_out=fan_out))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
+class RetrainRequest(BaseModel):
+    dataset_id: Optional[str] = Field(None, example="d-123")  # defaults to the parent model's dataset
+    n_estimators: int = Field(50, example=50)  # boosting rounds added on top of the parent
+
+@app.post("/projects/{project_id}/models/{model_id}/retrain")
+def retrain_model_endpoint(project_id: str, model_id: str, req: RetrainRequest):
+    try:
+        return FastJSONResponse(data_service.retrain_model(project_id, model_id, req.dataset_id, req.n_estimators))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
+
+@app.get("/projects/{project_id}/models/{model_id}/trials")
+def list_model_trials(project_id: str, model_id: str):
+    return FastJSONResponse(data_service.list_hyperparameter_trials(project_id, model_id))
+
 class UploadCOSResponse(BaseModel):
-    status: str = Field(..., example="success")
-    cos_path: str = Field(..., example="cos://bucket/key")
+    status: str = Field(..., example="pending")  # 'pending' (queued) or 'uploaded'
+    cos_path: Optional[str] = Field(None, example="cos://bucket/key")
 
 @app.post("/projects/{project_id}/models/{model_id}/upload-to-cos", response_model=UploadCOSResponse)
 def upload_model_to_cos_endpoint(project_id: str, model_id: str):
@@ -166,18 +248,143 @@ class PredictionRequest(BaseModel):
     model_id: str = Field(..., example="m-123")
     dataset_id: str = Field(..., example="d-123")
     project_id: str = Field(..., example="p1")
+    force: bool = Field(False, example=False)  # Rescore even if this model already scored this dataset version
 
 class PredictionResponse(BaseModel):
     prediction_id: str = Field(..., example="pred-run-123")
     status: str = Field(..., example="completed")
     output_table: str = Field(..., example="pred_res_guid")
     preview: List[Dict[str, Any]]
+    rows_scored: Optional[int] = Field(None, example=250000)
+    rows_per_second: Optional[float] = Field(None, example=180000.0)
+    memoized: Optional[bool] = Field(None, example=False)  # True when an earlier identical run was returned
 
 # ... (Previous endpoints)
 
 @app.post("/projects/{project_id}/models/predict", response_model=PredictionResponse)
 def predict_model(project_id: str, req: PredictionRequest):
-    return data_service.run_prediction(req.model_id, req.dataset_id, req.project_id)
+    return data_service.run_prediction(req.model_id, req.dataset_id, req.project_id, req.force)
+
+class EnsemblePredictionRequest(BaseModel):
+    model_ids: List[str] = Field(..., example=["m-123", "m-124"])
+    dataset_id: str = Field(..., example="d-123")
+    aggregate: Optional[str] = Field(None, example="vote")  # 'mean', 'vote' (classification) or none
+
+class EnsemblePredictionResponse(PredictionResponse):
+    models: Dict[str, str] = Field(..., example={"m-123": "pred_m-123", "m-124": "pred_m-124"})
+    aggregate: Optional[str] = Field(None, example="vote")
+
+@app.post("/projects/{project_id}/models/predict-ensemble", response_model=EnsemblePredictionResponse)
+def predict_ensemble(project_id: str, req: EnsemblePredictionRequest):
+    return data_service.run_ensemble_prediction(req.model_ids, req.dataset_id, project_id, req.aggregate)
+
+class OnlineScoreRequest(BaseModel):
+    instances: Optional[List[Dict[str, Any]]] = Field(None, example=[{"Value_Last_1Day": 82.5, "Date_Value_Last_28Days_Median": 71.0}])
+    devices: Optional[List[Dict[str, Any]]] = Field(None, example=[{"Type": "DB", "Application": "core", "IP": "10.0.0.1"}])
+    dataset_id: Optional[str] = Field(None, example="d-123")  # Source of device rows, defaults to the training dataset
+
+class OnlineScoreResponse(BaseModel):
+    model_id: str = Field(..., example="m-123")
+    task_type: str = Field(..., example="classification")
+    target_column: str = Field(..., example="Target")
+    predictions: List[Dict[str, Any]] = Field(..., example=[{"index": 0, "prediction": 1, "probability": 0.93}])
+    latency_ms: float = Field(..., example=1.8)
+
+@app.post("/projects/{project_id}/models/{model_id}/score", response_model=OnlineScoreResponse)
+def score_model_online(project_id: str, model_id: str, req: OnlineScoreRequest):
+    try:
+        return data_service.score_online(project_id, model_id, req.instances, req.devices, req.dataset_id)
+    except ValueError as e:
+        raise _scoring_error(project_id, model_id, e)
+
+def _scoring_error(project_id: str, model_id: str, error: ValueError) -> HTTPException:
+    # Looked up only on failure, so warm scoring requests stay off the database
+    status_code = 404 if data_service.get_model_entry(model_id, project_id) is None else 400
+    return HTTPException(status_code=status_code, detail=str(error))
+
+class FleetScoreRequest(BaseModel):
+    dataset_id: Optional[str] = Field(None, example="d-123")  # Defaults to the model's training dataset
+
+class FleetScoreResponse(BaseModel):
+    model_id: str = Field(..., example="m-123")
+    task_type: str = Field(..., example="classification")
+    target_column: str = Field(..., example="Target")
+    devices: int = Field(..., example=1200)
+    predictions: List[Dict[str, Any]] = Field(..., example=[{"Type": "DB", "Application": "core", "IP": "10.0.0.1", "Date": "2024-04-29 00:00:00", "prediction": 1, "probability": 0.91}])
+    latency_ms: float = Field(..., example=12.5)
+
+@app.post("/projects/{project_id}/models/{model_id}/score-fleet", response_model=FleetScoreResponse)
+def score_model_fleet(project_id: str, model_id: str, req: FleetScoreRequest):
+    try:
+        return data_service.score_fleet(project_id, model_id, req.dataset_id)
+    except ValueError as e:
+        raise _scoring_error(project_id, model_id, e)
+
+@app.get("/cache/online-features")
+def online_feature_store_stats():
+    return FastJSONResponse(data_service.online_feature_store.stats())
+
+@app.get("/metrics/latency")
+def latency_metrics():
+    return FastJSONResponse(data_service.latency.snapshot())
+
+class ScheduleRequest(BaseModel):
+    name: str = Field(..., example="nightly-refresh")
+    cron: str = Field(..., example="0 2 * * *")
+    dataset_id: str = Field(..., example="ds-123")
+    model_id: Optional[str] = Field(None, example="m-123")
+    stages: Optional[List[str]] = Field(None, example=["ingest", "feature_refresh", "scoring"])
+    source_path: Optional[str] = Field(None, example="exports/memory_daily.csv")  # Relative to SCHEDULER_INGEST_DIR
+    jitter_seconds: Optional[int] = Field(None, example=120)
+    enabled: bool = True
+
+class Schedule(BaseModel):
+    id: str
+    project_id: str
+    name: str
+    cron: str
+    dataset_id: str
+    model_id: Optional[str] = None
+    stages: List[str]
+    source_path: Optional[str] = None
+    jitter_seconds: int
+    enabled: bool
+    next_run_at: Optional[str] = None
+    last_run_at: Optional[str] = None
+
+class ScheduleRun(BaseModel):
+    id: str
+    schedule_id: str
+    status: str
+    stage_durations: Optional[Dict[str, float]] = None
+    details: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+@app.post("/projects/{project_id}/schedules", response_model=Schedule)
+def create_schedule(project_id: str, req: ScheduleRequest):
+    return data_service.create_schedule(project_id, req.name, req.cron, req.dataset_id, req.model_id, req.stages, req.source_path, req.jitter_seconds, req.enabled)
+
+@app.get("/projects/{project_id}/schedules", response_model=List[Schedule])
+def list_schedules(project_id: str):
+    return data_service.list_schedules(project_id)
+
+@app.delete("/projects/{project_id}/schedules/{schedule_id}")
+def delete_schedule(project_id: str, schedule_id: str):
+    return data_service.delete_schedule(project_id, schedule_id)
+
+@app.post("/projects/{project_id}/schedules/{schedule_id}/trigger")
+def trigger_schedule(project_id: str, schedule_id: str):
+    return data_service.trigger_schedule(project_id, schedule_id)
+
+@app.get("/projects/{project_id}/schedules/{schedule_id}/runs", response_model=List[ScheduleRun])
+def list_schedule_runs(project_id: str, schedule_id: str):
+    return data_service.list_schedule_runs(project_id, schedule_id)
+
+@app.get("/scheduler/running")
+def scheduler_running():
+    return {"running": data_service.scheduler.running(), "max_concurrency": data_service.scheduler.max_concurrency}
 
 from fastapi.responses import Response
 
@@ -189,6 +396,18 @@ def download_prediction(prediction_id: str):
     
     return Response(content=csv_content, media_type="text/csv", headers={"Content-Disposition": f"attachment; filename=prediction_results_{prediction_id}.csv"})
 
+@app.get("/cache/datasets")
+def dataset_cache_stats():
+    return FastJSONResponse(data_service.dataset_cache.stats())
+
+@app.get("/cache/models")
+def model_cache_stats():
+    return FastJSONResponse(data_service.model_cache.stats())
+
+@app.get("/cache/artifacts")
+def artifact_cache_stats():
+    return FastJSONResponse(data_service.artifact_cache.stats())
+
 @app.delete("/projects/{project_id}")
 def delete_project(project_id: str):
     return data_service.delete_project(project_id)
@@ -0,0 +1,173 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from backend.services.artifacts import MANIFEST_SUFFIX, sha256_file
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Local Disk Artifact Cache
+# ==========================
+# Read-through copy of COS objects on local disk, shared by every worker process on
+# the node. Files are published with an atomic rename, so a reader never sees a
+# partial download, and the least recently used artifacts are evicted (together with
+# their manifest sidecar) once the directory grows past its byte budget.
+
+_TMP_PREFIX = ".tmp-"
+
+
+class _HashingWriter:
+    """File wrapper that hashes bytes as they are written, so verification needs no second read."""
+
+    def __init__(self, f):
+        self._f = f
+        self._digest = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        return self._f.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class DiskArtifactCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.checksum_failures = 0
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        """Local path for an object key like `bucket/models/<id>.ubj.zst`."""
+        parts = [p for p in key.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+        return os.path.join(self.root, *parts)
+
+    def get(self, key: str, sha256: Optional[str] = None) -> Optional[str]:
+        """
+        Path of the cached object, or None. With `sha256` the file is verified and a
+        corrupt copy is dropped instead of returned.
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        if sha256 and sha256_file(path) != sha256:
+            logger.warning(f"Cached artifact {key} failed checksum verification, discarding it")
+            self.checksum_failures += 1
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            # mtime is the recency marker used for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def fetch(self, key: str, download: Callable[[Any], None], sha256: Optional[str] = None) -> str:
+        """
+        Read-through lookup: return the cached path, or call `download(fileobj)` to
+        stream the object into a temp file, verify it and publish it atomically.
+        """
+        path = self.get(key, sha256)
+        if path is not None:
+            return path
+        return self._publish(key, download, sha256)
+
+    def put_file(self, key: str, src_path: str, sha256: Optional[str] = None) -> str:
+        """Seed the cache with a local file, e.g. right after uploading it."""
+        def _copy(dst):
+            with open(src_path, "rb") as src:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        return self._publish(key, _copy, sha256)
+
+    def _publish(self, key: str, write: Callable[[Any], None], sha256: Optional[str]) -> str:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                sink = _HashingWriter(f)
+                write(sink)
+                f.flush()
+                os.fsync(f.fileno())
+            if sha256 and sink.hexdigest() != sha256:
+                self.checksum_failures += 1
+                raise ValueError(f"Downloaded artifact {key} does not match its expected checksum")
+            # Concurrent workers may race on the same key; the last rename wins with identical content
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Delete least recently used artifacts (never `keep`) until the cache fits its byte budget."""
+        with self._lock:
+            entries, total = self._scan()
+            removed = 0
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                self._remove(path)
+                self._remove(path + MANIFEST_SUFFIX)
+                total -= size
+                removed += 1
+            self.evictions += removed
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total = self._scan()
+        lookups = self.hits + self.misses
+        return {
+            "root": self.root,
+            "entries": len(entries),
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "checksum_failures": self.checksum_failures,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _scan(self):
+        """(mtime, size incl. manifest, path) for every cached artifact, and the total size."""
+        entries, total = [], 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.startswith(_TMP_PREFIX) or name.endswith(MANIFEST_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                size = stat.st_size
+                if os.path.exists(path + MANIFEST_SUFFIX):
+                    size += os.path.getsize(path + MANIFEST_SUFFIX)
+                entries.append((stat.st_mtime, size, path))
+                total += size
+        return entries, total
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
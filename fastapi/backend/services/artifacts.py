@@ -0,0 +1,198 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from backend.services.model_bundle import GroupedModelBundle
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Native Model Artifacts
+# ==========================
+# A model is saved as XGBoost's native UBJSON (optionally zstd-compressed) next to a
+# small JSON manifest. Per-group bundles are a stored (uncompressed) zip of one UBJSON
+# member per group plus the fallback. Legacy `.pkl` artifacts are still readable.
+
+ARTIFACT_FORMAT = "xgboost-ubj"
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path_for(artifact_path: str) -> str:
+    return artifact_path + MANIFEST_SUFFIX
+
+
+def is_legacy_artifact(path: str) -> bool:
+    return path.endswith(".pkl")
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _resolve_compression(compression: Optional[str]) -> Optional[str]:
+    if compression in (None, "", "none"):
+        return None
+    if compression != "zstd":
+        raise ValueError(f"Unsupported artifact compression '{compression}'")
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        logger.warning("zstandard not installed, saving model artifact uncompressed. Install with: pip install zstandard")
+        return None
+    return "zstd"
+
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstandard is required to load this model artifact. Install with: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _to_booster(model: Any):
+    """Native Booster for a sklearn estimator or Booster, trimmed to the early-stopping best iteration."""
+    import xgboost as xgb
+
+    if isinstance(model, xgb.Booster):
+        return model
+    booster = model.get_booster()
+    best_iteration = getattr(model, "best_iteration", None) if getattr(model, "early_stopping_rounds", None) else None
+    if best_iteration is not None and best_iteration + 1 < booster.num_boosted_rounds():
+        booster = booster[: best_iteration + 1]
+    return booster
+
+
+def _write_booster(model: Any, fileobj: BinaryIO, compression: Optional[str]) -> Dict[str, Any]:
+    """
+    Write the model's UBJSON to `fileobj` and return its config. The serialized buffer is
+    the only full copy: it is compressed as a stream, straight into `fileobj`.
+    """
+    booster = _to_booster(model)
+    raw = booster.save_raw("ubj")
+    if compression == "zstd":
+        import zstandard
+        with zstandard.ZstdCompressor(level=3).stream_writer(fileobj, size=len(raw), closefd=False) as writer:
+            writer.write(raw)
+    else:
+        fileobj.write(raw)
+    del raw
+    return json.loads(booster.save_config())
+
+
+def _load_booster(data: Any, compression: Optional[str], config: Optional[Dict[str, Any]] = None):
+    """`data` is the artifact bytes or, for a local file, its path."""
+    import xgboost as xgb
+
+    booster = xgb.Booster()
+    if isinstance(data, str):
+        if compression is None:
+            # XGBoost reads uncompressed files itself, without a Python-side copy
+            booster.load_model(data)
+        else:
+            with open(data, "rb") as f:
+                booster.load_model(bytearray(_decompress(f.read(), compression)))
+    else:
+        booster.load_model(bytearray(_decompress(data, compression)))
+    if config:
+        booster.load_config(json.dumps(config))
+    return booster
+
+
+def save_model_artifact(
+    model: Any,
+    model_dir: str,
+    model_id: str,
+    task_type: str,
+    features: List[str],
+    target: str,
+    dtypes: Optional[Dict[str, str]] = None,
+    compression: Optional[str] = "zstd",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Write `model` in the native format and its sidecar manifest.
+    Returns (artifact_path, manifest); the manifest carries the artifact's sha256.
+    """
+    import xgboost as xgb
+
+    compression = _resolve_compression(compression)
+    manifest: Dict[str, Any] = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "compression": compression,
+        "task_type": task_type,
+        "features": list(features),
+        "target": target,
+        "dtypes": dtypes or {},
+        "xgboost_version": xgb.__version__,
+    }
+
+    if isinstance(model, GroupedModelBundle):
+        artifact_path = os.path.join(model_dir, f"{model_id}.bundle.zip")
+        groups = []
+        with zipfile.ZipFile(artifact_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            with archive.open("fallback.ubj", "w") as member_file:
+                _write_booster(model.fallback, member_file, compression)
+            for i, (key, group_model) in enumerate(model.models.items()):
+                member = f"group_{i}.ubj"
+                with archive.open(member, "w") as member_file:
+                    _write_booster(group_model, member_file, compression)
+                groups.append({"key": [_json_scalar(v) for v in key], "member": member})
+        manifest.update({"kind": "bundle", "group_cols": model.group_cols, "groups": groups})
+    else:
+        suffix = ".ubj.zst" if compression == "zstd" else ".ubj"
+        artifact_path = os.path.join(model_dir, f"{model_id}{suffix}")
+        with open(artifact_path, "wb") as f:
+            config = _write_booster(model, f, compression)
+        manifest.update({"kind": "booster", "config": config})
+
+    manifest["sha256"] = sha256_file(artifact_path)
+    manifest["size_bytes"] = os.path.getsize(artifact_path)
+    with open(manifest_path_for(artifact_path), "w") as f:
+        json.dump(manifest, f)
+    return artifact_path, manifest
+
+
+def _load_native(artifact_path: str, manifest: Dict[str, Any]) -> Any:
+    """Build the model from a local native artifact."""
+    compression = manifest.get("compression")
+    if manifest.get("kind") == "bundle":
+        with zipfile.ZipFile(artifact_path) as archive:
+            fallback = _load_booster(archive.read("fallback.ubj"), compression)
+            models = {
+                tuple(g["key"]): _load_booster(archive.read(g["member"]), compression)
+                for g in manifest["groups"]
+            }
+        return GroupedModelBundle(manifest["task_type"], manifest["features"], manifest["group_cols"], models, fallback)
+    return _load_booster(artifact_path, compression, manifest.get("config"))
+
+
+def load_model_artifact(artifact_path: str, verify: bool = True) -> Any:
+    """
+    Load a local artifact in either the native format or the legacy pickle format.
+    The file is streamed (checksum, zip members, uncompressed boosters) rather than read whole.
+    """
+    if is_legacy_artifact(artifact_path):
+        with open(artifact_path, "rb") as f:
+            return pickle.load(f)
+    with open(manifest_path_for(artifact_path)) as f:
+        manifest = json.load(f)
+    if verify and manifest.get("sha256") and sha256_file(artifact_path) != manifest["sha256"]:
+        raise ValueError("Model artifact checksum does not match its manifest")
+    return _load_native(artifact_path, manifest)
+
+
+def _json_scalar(value: Any) -> Any:
+    # Group keys come from pandas and may be NumPy scalars
+    return value.item() if hasattr(value, "item") else value
@@ -0,0 +1,149 @@
+import time
+import logging
+import numpy as np
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+from backend.services.modeling import build_estimator, evaluate_predictions
+
+logger = logging.getLogger(__name__)
+
+WINDOW_MODES = ("expanding", "sliding")
+
+
+@dataclass
+class Fold:
+    fold: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+    train_from: str
+    train_to: str
+    test_from: str
+    test_to: str
+
+
+def walk_forward_splits(
+    dates: np.ndarray,
+    n_splits: int = 5,
+    window: str = "expanding",
+    train_periods: Optional[int] = None,
+    test_periods: Optional[int] = None,
+    gap_periods: int = 0,
+) -> List[Fold]:
+    """
+    Build walk-forward folds over `dates`, which must already be sorted ascending.
+
+    Periods are distinct dates, so every row of a given day lands in the same fold.
+    Each fold is returned as contiguous row ranges, which lets workers slice the
+    shared feature matrix without copying it. `gap_periods` leaves a buffer of dates
+    between train and test to keep look-ahead features from leaking.
+    """
+    if window not in WINDOW_MODES:
+        raise ValueError(f"Unsupported window '{window}'. Expected one of {list(WINDOW_MODES)}")
+
+    unique_dates = np.unique(dates)
+    n_periods = len(unique_dates)
+    test_periods = test_periods or n_periods // (n_splits + 1)
+    if test_periods < 1:
+        raise ValueError(f"Not enough distinct dates ({n_periods}) for {n_splits} folds")
+
+    first_test = n_periods - n_splits * test_periods
+    if window == "sliding":
+        train_periods = train_periods or first_test - gap_periods
+    if first_test - gap_periods < 1 or (train_periods is not None and train_periods < 1):
+        raise ValueError(f"Not enough distinct dates ({n_periods}) for {n_splits} folds of {test_periods} periods")
+
+    def _row(period: int) -> int:
+        # Map a period boundary to its first row position in the sorted frame
+        if period >= n_periods:
+            return len(dates)
+        return int(np.searchsorted(dates, unique_dates[period], side="left"))
+
+    def _label(period: int) -> str:
+        return str(np.datetime_as_string(unique_dates[period], unit="s"))
+
+    folds = []
+    for i in range(n_splits):
+        test_lo = first_test + i * test_periods
+        test_hi = test_lo + test_periods
+        train_hi = test_lo - gap_periods
+        train_lo = 0 if window == "expanding" else max(0, train_hi - train_periods)
+
+        folds.append(Fold(
+            fold=i,
+            train_start=_row(train_lo),
+            train_end=_row(train_hi),
+            test_start=_row(test_lo),
+            test_end=_row(test_hi),
+            train_from=_label(train_lo),
+            train_to=_label(train_hi - 1),
+            test_from=_label(test_lo),
+            test_to=_label(test_hi - 1),
+        ))
+    return folds
+
+
+def _fit_fold(fold: Fold, X: np.ndarray, y: np.ndarray, task_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Train and score one fold. X and y arrive memory-mapped, slices are views."""
+    start = time.perf_counter()
+    X_train, y_train = X[fold.train_start:fold.train_end], y[fold.train_start:fold.train_end]
+    X_test, y_test = X[fold.test_start:fold.test_end], y[fold.test_start:fold.test_end]
+
+    model = build_estimator(task_type, {**params, "n_jobs": 1})
+    model.fit(X_train, y_train)
+    metrics = evaluate_predictions(task_type, y_test, model.predict(X_test))
+
+    return {
+        **asdict(fold),
+        "train_rows": fold.train_end - fold.train_start,
+        "test_rows": fold.test_end - fold.test_start,
+        "metrics": metrics,
+        "duration_seconds": time.perf_counter() - start,
+    }
+
+
+def run_backtest(
+    task_type: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    dates: np.ndarray,
+    n_splits: int = 5,
+    window: str = "expanding",
+    train_periods: Optional[int] = None,
+    test_periods: Optional[int] = None,
+    gap_periods: int = 0,
+    params: Optional[Dict[str, Any]] = None,
+    n_jobs: int = -1,
+) -> Dict[str, Any]:
+    """
+    Walk-forward backtest with fold models trained in parallel.
+
+    X, y and dates must be sorted by date. joblib memory-maps X and y once for the
+    whole run, so every worker reads the same buffer instead of a per-fold copy.
+    Returns per-fold results and the mean/std of each metric across folds.
+    """
+    from joblib import Parallel, delayed
+
+    folds = walk_forward_splits(dates, n_splits, window, train_periods, test_periods, gap_periods)
+    start = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs, backend="loky", mmap_mode="r")(
+        delayed(_fit_fold)(fold, X, y, task_type, params or {})
+        for fold in folds
+    )
+    logger.info(f"Backtest ({window}, {n_splits} folds) finished in {time.perf_counter() - start:.2f}s")
+
+    aggregate = {}
+    for name in results[0]["metrics"]:
+        values = np.array([r["metrics"][name] for r in results], dtype=float)
+        aggregate[f"{name}_mean"] = float(values.mean())
+        aggregate[f"{name}_std"] = float(values.std())
+
+    return {
+        "window": window,
+        "n_splits": n_splits,
+        "gap_periods": gap_periods,
+        "aggregate": aggregate,
+        "folds": results,
+    }
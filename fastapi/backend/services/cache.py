@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe, process-local LRU cache bounded by total size in bytes and/or entry count.
+
+    `sizeof` returns the byte size charged for a value (required with `max_bytes`);
+    values larger than the whole budget are not cached. With `ttl_seconds`, entries
+    expire that long after they were stored. Hit, miss, eviction and expiration
+    counters are kept for `stats()`.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("sizeof is required when max_bytes is set")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        size = int(self._sizeof(value)) if self._sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        if self.max_entries is not None and self.max_entries < 1:
+            return False
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._over_budget():
+                oldest = next(iter(self._entries))
+                self._pop(oldest)
+                self.evictions += 1
+        return True
+
+    def _over_budget(self) -> bool:
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            return True
+        return self.max_entries is not None and len(self._entries) > self.max_entries
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`. Returns how many were dropped."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                self._pop(k)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+def dataframe_nbytes(df) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,104 @@
+import os
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# COS Transfers
+# ==========================
+# Multipart uploads and ranged downloads over a thread pool, written against the
+# plain S3 API (put/get/head object and the multipart calls) so the same code runs on
+# IBM COS or any S3-compatible stand-in. Every transfer streams: at most
+# `part_size * max_workers` bytes are held in memory, never the whole object.
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 lower bound for every part except the last
+
+
+@dataclass
+class TransferConfig:
+    multipart_threshold: int = 32 * 1024 * 1024
+    part_size: int = 16 * 1024 * 1024
+    max_workers: int = 8
+
+    @classmethod
+    def from_env(cls) -> "TransferConfig":
+        return cls(
+            multipart_threshold=int(os.environ.get("COS_MULTIPART_THRESHOLD", str(cls.multipart_threshold))),
+            part_size=max(MIN_PART_SIZE, int(os.environ.get("COS_PART_SIZE", str(cls.part_size)))),
+            max_workers=max(1, int(os.environ.get("COS_TRANSFER_WORKERS", str(cls.max_workers)))),
+        )
+
+
+def _read_range(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def upload_file(client: Any, bucket: str, key: str, path: str, config: Optional[TransferConfig] = None, content_type: str = "application/octet-stream") -> None:
+    """
+    Upload a local file. Small files go up in one streamed `put_object`; larger ones
+    as a multipart upload whose parts are read from disk and sent in parallel.
+    A failed multipart upload is aborted so no orphaned parts are billed.
+    """
+    config = config or TransferConfig.from_env()
+    size = os.path.getsize(path)
+    if size < config.multipart_threshold:
+        with open(path, "rb") as f:
+            client.put_object(Bucket=bucket, Key=key, Body=f, ContentType=content_type)
+        return
+
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+    offsets = range(0, size, config.part_size)
+
+    def _upload_part(number: int, offset: int) -> Dict[str, Any]:
+        body = _read_range(path, offset, config.part_size)
+        response = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    try:
+        with ThreadPoolExecutor(max_workers=config.max_workers) as pool:
+            parts = list(pool.map(_upload_part, range(1, len(offsets) + 1), offsets))
+        client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+    except Exception:
+        try:
+            client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception as e:
+            logger.warning(f"Failed to abort multipart upload of {key}: {e}")
+        raise
+    logger.info(f"Uploaded {key} in {len(parts)} parts ({size} bytes)")
+
+
+def download_fileobj(client: Any, bucket: str, key: str, fileobj: BinaryIO, config: Optional[TransferConfig] = None) -> int:
+    """
+    Stream an object into `fileobj` and return its size.
+
+    Large objects are fetched as parallel ranged GETs. Parts are written strictly in
+    order through a window of `max_workers` in-flight requests, so `fileobj` may be a
+    non-seekable stream (e.g. one that hashes as it writes).
+    """
+    config = config or TransferConfig.from_env()
+    size = int(client.head_object(Bucket=bucket, Key=key)["ContentLength"])
+    if size < config.multipart_threshold:
+        body = client.get_object(Bucket=bucket, Key=key)["Body"]
+        for block in iter(lambda: body.read(1024 * 1024), b""):
+            fileobj.write(block)
+        return size
+
+    def _get_range(offset: int) -> bytes:
+        end = min(offset + config.part_size, size) - 1
+        return client.get_object(Bucket=bucket, Key=key, Range=f"bytes={offset}-{end}")["Body"].read()
+
+    offsets = iter(range(0, size, config.part_size))
+    with ThreadPoolExecutor(max_workers=config.max_workers) as pool:
+        window: deque = deque(pool.submit(_get_range, o) for _, o in zip(range(config.max_workers), offsets))
+        while window:
+            fileobj.write(window.popleft().result())
+            offset = next(offsets, None)
+            if offset is not None:
+                window.append(pool.submit(_get_range, offset))
+    return size
@@ -6,16 +6,35 @@ import io
 import os
 import json
 import socket
+import time
 import joblib
 import pickle
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Iterable, Any, Optional
+import random
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Any, Optional
 
 # SQLAlchemy Imports
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Float, JSON, text, LargeBinary
+from sqlalchemy import create_engine, Column, String, Integer, DateTime, Float, JSON, text, LargeBinary, inspect
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from backend.services.modeling import build_estimator, evaluate_predictions, predict_with_model, to_float32_matrix
+from backend.services.model_bundle import GroupedModelBundle
+from backend.services.cache import LRUCache, dataframe_nbytes
+from backend.services.artifacts import save_model_artifact, load_model_artifact, is_legacy_artifact, manifest_path_for, sha256_file
+from backend.services.artifact_cache import DiskArtifactCache
+from backend.services import cos_transfer
+from backend.services.upload_queue import UploadQueue
+from backend.services.latency import LatencyRegistry
+from backend.services.feature_store import LatestFeatureStore, normalize_key
+from backend.services.scheduler import CronSchedule, Scheduler
+from backend.services.feature_selection import (
+    MAX_DISCRETE_CLASSES, SAMPLING_MODES, allocate_strata, correlation_intervals,
+    reservoir_sample, select_features, stratified_sample, stratum_weights,
+)
+
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,6 +65,58 @@ COS_API_KEY = os.environ.get("COS_API_KEY", "51C4_YbyMlAUtOvVS8kr6mcLN2vynD6EIu2
 COS_INSTANCE_CRN = os.environ.get("COS_INSTANCE_CRN", "crn:v1:bluemix:public:cloud-object-storage:global:a/a704679d44274f75b74b60a5a7c9ddd1:c93698cb-4ddb-48e6-947c-e3bd7951b3ab::")
 COS_S3_ENDPOINT = os.environ.get("COS_S3_ENDPOINT", "https://s3.us-south.cloud-object-storage.appdomain.cloud")
 COS_BUCKET = os.environ.get("COS_BUCKET", "mandiriforecasting-donotdelete-pr-iazsd30vb3oqyk")
+# HMAC credentials switch the client from IAM to S3v4 signing, e.g. for a local
+# S3-compatible stand-in (pair with COS_S3_ENDPOINT)
+COS_HMAC_ACCESS_KEY_ID = os.environ.get("COS_HMAC_ACCESS_KEY_ID")
+COS_HMAC_SECRET_ACCESS_KEY = os.environ.get("COS_HMAC_SECRET_ACCESS_KEY")
+# Background model uploads: worker threads and retry policy (exponential backoff)
+COS_UPLOAD_WORKERS = int(os.environ.get("COS_UPLOAD_WORKERS", "2"))
+COS_UPLOAD_MAX_ATTEMPTS = int(os.environ.get("COS_UPLOAD_MAX_ATTEMPTS", "5"))
+COS_UPLOAD_BACKOFF_SECONDS = float(os.environ.get("COS_UPLOAD_BACKOFF_SECONDS", "2"))
+# Size of the shared COS client's HTTP connection pool
+COS_MAX_POOL_CONNECTIONS = int(os.environ.get("COS_MAX_POOL_CONNECTIONS", "32"))
+
+# Local read-through copy of COS artifacts, shared by the workers on a node
+ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", "artifact_cache")
+ARTIFACT_CACHE_MAX_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+
+# Model artifacts are saved in XGBoost's native UBJSON format, compressed with zstd
+# when the zstandard package is installed ("none" disables compression)
+MODEL_ARTIFACT_COMPRESSION = os.environ.get("MODEL_ARTIFACT_COMPRESSION", "zstd")
+
+# ==========================
+# Dataset Cache Configuration
+# ==========================
+# Byte budget for engineered DataFrames kept in memory between pipeline stages (0 disables)
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# ==========================
+# Model Cache Configuration
+# ==========================
+# Deserialized models kept in memory between predictions (0 entries disables)
+MODEL_CACHE_MAX_ENTRIES = int(os.environ.get("MODEL_CACHE_MAX_ENTRIES", "16"))
+MODEL_CACHE_TTL_SECONDS = float(os.environ.get("MODEL_CACHE_TTL_SECONDS", "3600"))
+# Rows scored and written per batch-prediction chunk
+PREDICTION_CHUNK_SIZE = int(os.environ.get("PREDICTION_CHUNK_SIZE", "100000"))
+# Largest batch accepted by the online scoring endpoint
+ONLINE_MAX_INSTANCES = int(os.environ.get("ONLINE_MAX_INSTANCES", "1000"))
+
+# Threads used to score feature columns during feature selection
+FEATURE_SELECTION_WORKERS = int(os.environ.get("FEATURE_SELECTION_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# ==========================
+# Scheduler Configuration
+# ==========================
+# Off by default: enable it in one process only, every uvicorn worker would otherwise poll on its own.
+# That process also re-queues COS uploads left pending at startup
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "false").lower() in ("1", "true", "yes")
+# Pipelines allowed to run at once across all projects
+SCHEDULER_MAX_CONCURRENCY = int(os.environ.get("SCHEDULER_MAX_CONCURRENCY", "2"))
+SCHEDULER_POLL_SECONDS = float(os.environ.get("SCHEDULER_POLL_SECONDS", "30"))
+# Default random delay added to each run so schedules sharing a cron time don't hit the database together
+SCHEDULER_DEFAULT_JITTER_SECONDS = int(os.environ.get("SCHEDULER_DEFAULT_JITTER_SECONDS", "120"))
+# The ingest stage only reads files under this directory; schedule source paths are relative to it
+SCHEDULER_INGEST_DIR = os.environ.get("SCHEDULER_INGEST_DIR", "ingest")
 
 # SQLAlchemy Setup
 engine = create_engine(DATABASE_URL, connect_args=connect_args)
@@ -73,6 +144,7 @@ class FeatureEngineeredTable(Base):
     dataset_id = Column(String, primary_key=True)
     project_id = Column(String, nullable=False)
     table_name = Column(String, nullable=False) 
+    version = Column(Integer, nullable=True, default=1)  # Bumped on every rewrite of the table
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class FeatureSelectionRun(Base):
@@ -82,6 +154,7 @@ class FeatureSelectionRun(Base):
     project_id = Column(String, nullable=False)
     dataset_id = Column(String, nullable=False)
     target_column = Column(String, nullable=False)
+    strategy = Column(String, nullable=True)  # Ranking strategy; None for runs made before strategies existed
     selected_features = Column(JSON, nullable=False) 
     dropped_features = Column(JSON, nullable=True)   
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -99,6 +172,33 @@ class TrainedModel(Base):
     metrics = Column(JSON, nullable=False)
     artifact_path = Column(String, nullable=True)
     cos_path = Column(String, nullable=True)  # COS storage path
+    upload_state = Column(String, nullable=True)  # COS upload: pending | uploaded | failed
+    upload_attempts = Column(Integer, nullable=True)
+    upload_error = Column(String, nullable=True)
+    artifact_checksum = Column(String, nullable=True)  # sha256 of the artifact file
+    training_cutoff = Column(DateTime, nullable=True)  # Latest `Date` seen in training data
+    parent_model_id = Column(String, nullable=True)  # Set when warm-started from another model
+    rows_added = Column(Integer, nullable=True)  # Rows boosted on when warm-started
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class HyperparameterTrial(Base):
+    __tablename__ = "hyperparameter_trials"
+
+    id = Column(String, primary_key=True)
+    search_id = Column(String, nullable=False, index=True)
+    project_id = Column(String, nullable=False)
+    dataset_id = Column(String, nullable=False)
+    model_id = Column(String, nullable=True, index=True)  # Model trained from the best trial
+    search_mode = Column(String, nullable=False)  # 'random', 'halving'
+    trial_number = Column(Integer, nullable=False)
+    rung = Column(Integer, nullable=False, default=0)
+    params = Column(JSON, nullable=False)
+    n_estimators = Column(Integer, nullable=False)
+    best_iteration = Column(Integer, nullable=True)
+    metrics = Column(JSON, nullable=False)
+    score = Column(Float, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    is_best = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class PredictionRun(Base):
@@ -110,14 +210,68 @@ class PredictionRun(Base):
     dataset_id = Column(String, nullable=False)
     status = Column(String, nullable=False) # 'completed', 'failed'
     output_path = Column(String, nullable=True) # Params for download
+    rows_scored = Column(Integer, nullable=True)
+    rows_per_second = Column(Float, nullable=True)  # Scoring throughput, including result writes
+    artifact_checksum = Column(String, nullable=True)  # Model artifact scored, for memoization
+    dataset_version = Column(Integer, nullable=True)  # Engineered dataset version scored
+    ensemble_id = Column(String, nullable=True)  # Shared by the per-model rows of one ensemble prediction
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class PipelineSchedule(Base):
+    __tablename__ = "pipeline_schedules"
+
+    id = Column(String, primary_key=True)
+    project_id = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
+    cron = Column(String, nullable=False)  # minute hour day month weekday, UTC
+    dataset_id = Column(String, nullable=False)
+    model_id = Column(String, nullable=True)  # Required for the scoring stage
+    stages = Column(JSON, nullable=False)  # Ordered subset of PIPELINE_STAGES
+    source_path = Column(String, nullable=True)  # File re-read by the ingest stage
+    jitter_seconds = Column(Integer, nullable=False, default=0)
+    enabled = Column(Integer, nullable=False, default=1)
+    next_run_at = Column(DateTime, nullable=True, index=True)
+    last_run_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class PipelineRun(Base):
+    __tablename__ = "pipeline_runs"
+
+    id = Column(String, primary_key=True)
+    schedule_id = Column(String, nullable=False, index=True)
+    project_id = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # 'running', 'completed', 'failed'
+    stage_durations = Column(JSON, nullable=True)  # {stage: seconds}
+    details = Column(JSON, nullable=True)  # Per-stage outcome (rows ingested, prediction id, ...)
+    error = Column(String, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
 # ==========================
 # Database Helper Functions
 # ==========================
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+def _add_missing_columns():
+    """
+    create_all only creates missing tables, so add columns introduced after a
+    table was first created. New columns must be nullable.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            logger.info(f"Added column {table.name}.{column.name}")
 
 def get_db():
     db = SessionLocal()
@@ -175,39 +329,98 @@ def load_raw_dataset(dataset_id: str) -> pd.DataFrame:
     finally:
         db.close()
 
+# Engineered DataFrames keyed by (dataset_id, version), shared by feature selection,
+# training and prediction. Cached frames are shared: callers must treat them as read-only.
+dataset_cache = LRUCache(max_bytes=DATASET_CACHE_MAX_BYTES, sizeof=dataframe_nbytes)
+
+def invalidate_dataset_cache(dataset_id: str) -> int:
+    return dataset_cache.invalidate(lambda key: key[0] == dataset_id)
+
 def save_engineered_dataset(dataset_id: str, project_id: str, df: pd.DataFrame):
     db = SessionLocal()
     table_name = f"feat_{dataset_id.replace('-', '_')}"
     try:
-        # Record metadata
+        # Write actual data
+        invalidate_dataset_cache(dataset_id)
+        df.to_sql(table_name, engine, if_exists='replace', index=False)
+        logger.info(f"Saved engineered data to table {table_name}")
+
+        # Record metadata, bumping the version so cached copies of the old table are never served
         existing = db.query(FeatureEngineeredTable).filter_by(dataset_id=dataset_id).first()
         if not existing:
             entry = FeatureEngineeredTable(
                 dataset_id=dataset_id,
                 project_id=project_id,
-                table_name=table_name
+                table_name=table_name,
+                version=1
             )
             db.add(entry)
-            db.commit()
-        
-        # Write actual data
-        df.to_sql(table_name, engine, if_exists='replace', index=False)
-        logger.info(f"Saved engineered data to table {table_name}")
+        else:
+            existing.version = (existing.version or 1) + 1
+        db.commit()
+        return (existing.version if existing else 1)
+    finally:
+        db.close()
+
+def get_engineered_version(dataset_id: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        entry = db.query(FeatureEngineeredTable).filter_by(dataset_id=dataset_id).first()
+        return (entry.version or 1) if entry else None
     finally:
         db.close()
 
 def load_engineered_dataset(dataset_id: str) -> pd.DataFrame:
+    """
+    Load the engineered table, served from the in-process cache when this version
+    was already read. The returned frame may be shared and must not be mutated.
+    """
     db = SessionLocal()
     try:
         entry = db.query(FeatureEngineeredTable).filter_by(dataset_id=dataset_id).first()
         if not entry:
             raise ValueError(f"Engineered dataset {dataset_id} not found in registry")
-        
-        return pd.read_sql_table(entry.table_name, engine)
+        table_name, version = entry.table_name, entry.version or 1
     finally:
         db.close()
 
-def save_feature_selection(run_id: str, project_id: str, dataset_id: str, target_col: str, selected: list, dropped: list):
+    key = (dataset_id, version)
+    df = dataset_cache.get(key)
+    if df is not None:
+        return df
+
+    df = pd.read_sql_table(table_name, engine)
+    dataset_cache.put(key, df)
+    return df
+
+def get_engineered_table_name(dataset_id: str) -> str:
+    db = SessionLocal()
+    try:
+        entry = db.query(FeatureEngineeredTable).filter_by(dataset_id=dataset_id).first()
+        if not entry:
+            raise ValueError(f"Engineered dataset {dataset_id} not found in registry")
+        return entry.table_name
+    finally:
+        db.close()
+
+def iter_engineered_dataset(dataset_id: str, columns: Optional[list] = None, chunksize: int = 100_000, con=None) -> Iterator[pd.DataFrame]:
+    """
+    Stream the engineered table in chunks of `chunksize` rows, reading only `columns`.
+    Pass `con` to read on a connection that is also used for writes while streaming; it
+    should be opened with `stream_results=True` like the default one.
+    """
+    table_name = get_engineered_table_name(dataset_id)
+    if con is not None:
+        yield from pd.read_sql_table(table_name, con, columns=columns, chunksize=chunksize)
+        return
+    # Server-side cursor: psycopg2 otherwise fetches the whole result before the first chunk
+    with engine.connect().execution_options(stream_results=True) as conn:
+        if engine.dialect.name == "postgresql":
+            # Start every scan at the first page, so repeated reads return the same batches
+            conn.execute(text("SET LOCAL synchronize_seqscans = off"))
+        yield from pd.read_sql_table(table_name, conn, columns=columns, chunksize=chunksize)
+
+def save_feature_selection(run_id: str, project_id: str, dataset_id: str, target_col: str, selected: list, dropped: list, strategy: str = None):
     db = SessionLocal()
     try:
         entry = FeatureSelectionRun(
@@ -215,6 +428,7 @@ def save_feature_selection(run_id: str, project_id: str, dataset_id: str, target
             project_id=project_id,
             dataset_id=dataset_id,
             target_column=target_col,
+            strategy=strategy,
             selected_features=selected,
             dropped_features=dropped
         )
@@ -230,7 +444,7 @@ def get_feature_selection(run_id: str):
     finally:
         db.close()
 
-def save_model_metadata(model_id: str, name: str, project_id: str, dataset_id: str, selection_id: str, task: str, target: str, metrics: dict, artifact_path: str = None, cos_path: str = None):
+def save_model_metadata(model_id: str, name: str, project_id: str, dataset_id: str, selection_id: str, task: str, target: str, metrics: dict, artifact_path: str = None, cos_path: str = None, artifact_checksum: str = None, training_cutoff: datetime = None, parent_model_id: str = None, rows_added: int = None, upload_state: str = None):
     db = SessionLocal()
     try:
         entry = TrainedModel(
@@ -243,14 +457,78 @@ def save_model_metadata(model_id: str, name: str, project_id: str, dataset_id: s
             target_column=target,
             metrics=metrics,
             artifact_path=artifact_path,
-            cos_path=cos_path
+            cos_path=cos_path,
+            upload_state=upload_state,
+            artifact_checksum=artifact_checksum,
+            training_cutoff=training_cutoff,
+            parent_model_id=parent_model_id,
+            rows_added=rows_added
         )
         db.add(entry)
         db.commit()
     finally:
         db.close()
 
-def save_prediction_run(run_id: str, project_id: str, model_id: str, dataset_id: str, status: str, output_path: str):
+def get_model_entry(model_id: str, project_id: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        query = db.query(TrainedModel).filter_by(id=model_id)
+        if project_id:
+            query = query.filter_by(project_id=project_id)
+        return query.first()
+    finally:
+        db.close()
+
+def save_hyperparameter_trials(search_id: str, project_id: str, dataset_id: str, model_id: str, mode: str, trials: list, best_trial):
+    db = SessionLocal()
+    try:
+        for t in trials:
+            db.add(HyperparameterTrial(
+                id=str(uuid.uuid4()),
+                search_id=search_id,
+                project_id=project_id,
+                dataset_id=dataset_id,
+                model_id=model_id,
+                search_mode=mode,
+                trial_number=t.trial_number,
+                rung=t.rung,
+                params=t.params,
+                n_estimators=t.n_estimators,
+                best_iteration=t.best_iteration,
+                metrics=t.metrics,
+                score=t.score,
+                duration_seconds=t.duration_seconds,
+                is_best=1 if t is best_trial else 0
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+def list_hyperparameter_trials(project_id: str, model_id: str):
+    session = SessionLocal()
+    try:
+        trials = session.query(HyperparameterTrial).filter_by(project_id=project_id, model_id=model_id) \
+            .order_by(HyperparameterTrial.rung, HyperparameterTrial.trial_number).all()
+        return [
+            {
+                "search_id": t.search_id,
+                "search_mode": t.search_mode,
+                "trial_number": t.trial_number,
+                "rung": t.rung,
+                "params": t.params,
+                "n_estimators": t.n_estimators,
+                "best_iteration": t.best_iteration,
+                "metrics": t.metrics,
+                "score": t.score,
+                "duration_seconds": t.duration_seconds,
+                "is_best": bool(t.is_best)
+            }
+            for t in trials
+        ]
+    finally:
+        session.close()
+
+def save_prediction_run(run_id: str, project_id: str, model_id: str, dataset_id: str, status: str, output_path: str, rows_scored: int = None, rows_per_second: float = None, artifact_checksum: str = None, dataset_version: int = None, ensemble_id: str = None):
     db = SessionLocal()
     try:
         entry = PredictionRun(
@@ -259,7 +537,12 @@ def save_prediction_run(run_id: str, project_id: str, model_id: str, dataset_id:
             model_id=model_id,
             dataset_id=dataset_id,
             status=status,
-            output_path=output_path
+            output_path=output_path,
+            rows_scored=rows_scored,
+            rows_per_second=rows_per_second,
+            artifact_checksum=artifact_checksum,
+            dataset_version=dataset_version,
+            ensemble_id=ensemble_id
         )
         db.add(entry)
         db.commit()
@@ -267,18 +550,21 @@ def save_prediction_run(run_id: str, project_id: str, model_id: str, dataset_id:
         db.close()
 
 def get_prediction_run(run_id: str):
+    """The run with this id or, for an ensemble prediction id, one of its per-model runs."""
     db = SessionLocal()
     try:
-        return db.query(PredictionRun).filter_by(id=run_id).first()
+        return db.query(PredictionRun).filter((PredictionRun.id == run_id) | (PredictionRun.ensemble_id == run_id)).first()
     finally:
         db.close()
 
-def save_prediction_result_table(run_id: str, df: pd.DataFrame):
+def save_prediction_result_table(run_id: str, df: pd.DataFrame, if_exists: str = 'replace', con=None):
     """
     Saves prediction result to a dynamic table `pred_res_{run_id}`.
+    Pass if_exists='append' to add a further chunk of results, and `con` to write
+    inside a caller-managed transaction.
     """
     table_name = f"pred_res_{run_id.replace('-', '_')}"
-    df.to_sql(table_name, engine, if_exists='replace', index=False)
+    df.to_sql(table_name, con if con is not None else engine, if_exists=if_exists, index=False)
     return table_name
 
 def upload_external_prediction(project_id: str, filename: str, content: bytes) -> str:
@@ -321,6 +607,8 @@ def delete_project_resources(project_id: str):
         # Find all datasets
         datasets = db.query(DatasetRegistry).filter_by(project_id=project_id).all()
         for ds in datasets:
+            invalidate_dataset_cache(ds.id)
+
             # Drop Engineered
             feat = db.query(FeatureEngineeredTable).filter_by(dataset_id=ds.id).first()
             if feat:
@@ -330,6 +618,15 @@ def delete_project_resources(project_id: str):
                         conn.commit()
                 except Exception as e:
                     logger.warning(f"Failed to drop table {feat.table_name}: {e}")
+
+            # Drop Online Feature Store
+            online_feature_store.invalidate(ds.id)
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {get_online_table_name(ds.id)}"))
+                    conn.commit()
+            except Exception as e:
+                logger.warning(f"Failed to drop table {get_online_table_name(ds.id)}: {e}")
             
             # Drop Raw
             raw_table_name = f"raw_{ds.id.replace('-', '_')}"
@@ -343,6 +640,10 @@ def delete_project_resources(project_id: str):
             except Exception as e:
                 logger.warning(f"Failed to drop table {raw_table_name}: {e}")
         
+        for m in db.query(TrainedModel.id).filter_by(project_id=project_id).all():
+            invalidate_model_cache(m.id)
+        serving_cache.invalidate(lambda key: key[0] == project_id)
+
         # 2. Drop Prediction Result Tables
         predictions = db.query(PredictionRun).filter_by(project_id=project_id).all()
         for p in predictions:
@@ -355,7 +656,10 @@ def delete_project_resources(project_id: str):
                     logger.warning(f"Failed to drop table {p.output_path}: {e}")
 
         # 3. Delete Metadata Records
+        db.query(PipelineRun).filter_by(project_id=project_id).delete()
+        db.query(PipelineSchedule).filter_by(project_id=project_id).delete()
         db.query(PredictionRun).filter_by(project_id=project_id).delete()
+        db.query(HyperparameterTrial).filter_by(project_id=project_id).delete()
         db.query(TrainedModel).filter_by(project_id=project_id).delete()
         db.query(FeatureSelectionRun).filter_by(project_id=project_id).delete()
         db.query(FeatureEngineeredTable).filter_by(project_id=project_id).delete()
@@ -377,6 +681,9 @@ def _load_env_file_internal(path: str = ".env") -> bool:
     # ... Simplified loaded mostly used by main/standalone, not critical for service if env already loaded by uvicorn/dotenv
     return True
 
+# Columns identifying one device in raw and engineered tables
+DEVICE_KEY_COLS = ["Type", "Application", "IP"]
+
 def engineer_memory_features(
     df: pd.DataFrame,
     value_col: str = "Value",
@@ -518,7 +825,11 @@ def list_models(project_id: str):
                 "task_type": m.task_type,
                 "target_column": m.target_column,
                 "metrics": m.metrics,
-                "cos_path": m.cos_path
+                "cos_path": m.cos_path,
+                "upload_state": m.upload_state,
+                "upload_error": m.upload_error,
+                "parent_model_id": m.parent_model_id,
+                "rows_added": m.rows_added
             })
         return results
     finally:
@@ -537,8 +848,13 @@ def run_feature_engineering(dataset_id: str, project_id: str):
         df_feat = engineer_memory_features(df_raw, value_col=value_col)
         logger.info(f"Feature engineering complete. Shape: {df_feat.shape}")
 
-        # 3. Save Engineered to Postgres
-        save_engineered_dataset(dataset_id, project_id, df_feat)
+        # 3. Fold the newest row per device into the online feature store. Its table is
+        # written before the version bump so other workers never pair old rows with the new version
+        latest = refresh_online_features(dataset_id, df_feat)
+
+        # 4. Save Engineered to Postgres
+        version = save_engineered_dataset(dataset_id, project_id, df_feat)
+        online_feature_store.install(dataset_id, latest, version)
         
         return {"status": "success", "columns": list(df_feat.columns)}
         
@@ -549,36 +865,116 @@ def run_feature_engineering(dataset_id: str, project_id: str):
         logger.error(f"FE Failed: {e}", exc_info=True)
         raise ValueError(f"Feature Engineering process failed: {str(e)}")
 
-def run_feature_selection(dataset_id: str, project_id: str, target_column: str, top_k: int = 10):
+def _stratum_counts(dataset_id: str, strata_cols: list) -> pd.DataFrame:
+    """Row count per stratum (`n_rows`), aggregated by the database unless the table is cached."""
+    cached = dataset_cache.get((dataset_id, get_engineered_version(dataset_id)))
+    if cached is not None:
+        return cached.groupby(strata_cols, dropna=False).size().reset_index(name="n_rows")
+    cols = ", ".join(f'"{c}"' for c in strata_cols)
+    query = f'SELECT {cols}, COUNT(*) AS n_rows FROM "{get_engineered_table_name(dataset_id)}" GROUP BY {cols}'
+    return pd.read_sql(text(query), engine)
+
+def _target_is_discrete(dataset_id: str, target_column: str) -> bool:
+    """Whether the target looks like class labels, read without scanning every distinct value."""
+    cached = dataset_cache.get((dataset_id, get_engineered_version(dataset_id)))
+    if cached is not None:
+        values = cached[target_column].dropna().unique()[:MAX_DISCRETE_CLASSES + 1]
+    else:
+        query = f'SELECT DISTINCT "{target_column}" FROM "{get_engineered_table_name(dataset_id)}" WHERE "{target_column}" IS NOT NULL LIMIT {MAX_DISCRETE_CLASSES + 1}'
+        values = pd.read_sql(text(query), engine)[target_column].to_numpy()
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    return len(values) <= MAX_DISCRETE_CLASSES and bool(np.all(values == np.round(values)))
+
+def sample_engineered_dataset(dataset_id: str, target_column: str, sample: dict) -> tuple:
+    """
+    Draw a feature-selection sample while streaming the engineered table.
+
+    `sample` holds mode ('stratified' or 'reservoir'), size, group_by and seed. Stratified
+    sampling allocates rows per device group (and per target class for discrete targets)
+    from counts aggregated by the database. Returns (sample frame, population rows, row
+    weights, mode used): the weights undo the stratified over-sampling of small strata and
+    are None for a uniform sample, which is also the fallback when strata can't be allocated.
+    """
+    mode = sample.get("mode", "stratified")
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unsupported sampling mode '{mode}'. Expected one of {list(SAMPLING_MODES)}")
+    size, seed = int(sample.get("size") or 200_000), int(sample.get("seed", 42))
+    chunks = _iter_scoring_chunks(dataset_id, None, PREDICTION_CHUNK_SIZE)
+
+    if mode == "reservoir":
+        return (*reservoir_sample(chunks, size, seed), None, "reservoir")
+
+    columns = [c["name"] for c in inspect(engine).get_columns(get_engineered_table_name(dataset_id))]
+    group_by = sample.get("group_by")
+    strata_cols = [c for c in (group_by if group_by is not None else DEVICE_KEY_COLS) if c in columns]
+    if target_column in columns and _target_is_discrete(dataset_id, target_column):
+        strata_cols.append(target_column)
+    if not strata_cols:
+        return (*reservoir_sample(chunks, size, seed), None, "reservoir")
+    counts = _stratum_counts(dataset_id, strata_cols)
+    allocation = allocate_strata(counts, size)
+    if allocation is None:
+        logger.warning(f"{len(counts)} strata need more than {size} rows at their minimum, sampling uniformly instead")
+        return (*reservoir_sample(chunks, size, seed), None, "reservoir")
+    frame = stratified_sample(chunks, strata_cols, allocation, seed)
+    return frame, int(counts["n_rows"].sum()), stratum_weights(frame, strata_cols, allocation), "stratified"
+
+DROP_REASONS = {
+    "correlation": "Low correlation or outside top-k",
+    "mutual_info": "Low mutual information or outside top-k",
+    "mrmr": "Redundant with selected features or outside top-k",
+    "model_importance": "Low model importance or outside top-k",
+}
+
+def run_feature_selection(dataset_id: str, project_id: str, target_column: str, top_k: int = 10, strategy: str = "correlation", sample: Optional[dict] = None):
+    """
+    Rank features against `target_column` and save the top_k as a selection run.
+
+    When `sample` is given (mode, size, group_by, confidence, seed), features are ranked on
+    a sample streamed from the engineered table instead of the full table, and the response
+    reports the sample size and confidence intervals on the selected features' correlations.
+    """
     try:
-        df = load_engineered_dataset(dataset_id)
+        if sample:
+            df, population_rows, weights, sample_mode = sample_engineered_dataset(dataset_id, target_column, sample)
+            if df.empty:
+                raise ValueError(f"Engineered dataset {dataset_id} is empty")
+            logger.info(f"Feature selection sample: {len(df)} of {population_rows} rows ({sample_mode})")
+        else:
+            df = load_engineered_dataset(dataset_id)
         
         if target_column not in df.columns:
             raise ValueError(f"Target column '{target_column}' not found in dataset columns: {list(df.columns)}")
-            
-        numeric_df = df.select_dtypes(include=['number'])
-        
-        if target_column not in numeric_df.columns:
-             raise ValueError(f"Target column '{target_column}' matches no numeric data for correlation check.")
 
-        correlations = numeric_df.corr()[target_column].abs().sort_values(ascending=False)
-        features_corr = correlations.drop(labels=[target_column], errors='ignore')
-        selected = features_corr.head(top_k).index.tolist()
+        # Scores each feature against the target only, never the full feature-by-feature matrix
+        selected, scores = select_features(df, target_column, top_k, strategy, workers=FEATURE_SELECTION_WORKERS)
         
-        all_numeric = [c for c in numeric_df.columns if c != target_column]
+        reason = DROP_REASONS[strategy]
         dropped = [
-            {"name": c, "reason": "Low correlation or outside top-k"} 
-            for c in all_numeric if c not in selected
+            {"name": c, "reason": reason} 
+            for c in scores if c not in selected
         ]
         
         run_id = str(uuid.uuid4())
-        save_feature_selection(run_id, project_id, dataset_id, target_column, selected, dropped)
+        save_feature_selection(run_id, project_id, dataset_id, target_column, selected, dropped, strategy)
         
-        return {
+        result = {
             "selection_id": run_id, 
+            "strategy": strategy,
             "selected_features": selected, 
-            "dropped_features": dropped
+            "dropped_features": dropped,
+            "scores": {c: scores[c] for c in selected}
         }
+        if sample:
+            confidence = float(sample.get("confidence", 0.95))
+            result["sample"] = {
+                "mode": sample_mode,
+                "rows": len(df),
+                "population_rows": population_rows,
+                "confidence": confidence,
+            }
+            result["confidence_intervals"] = correlation_intervals(df, target_column, selected, confidence, weights)
+        return result
     except Exception as e:
         logger.error(f"Feature Selection Failed: {e}", exc_info=True)
         raise ValueError(f"Feature Selection failed: {str(e)}")
@@ -588,7 +984,21 @@ OUTPUT_DIR = "outputs"
 os.makedirs(MODEL_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def train_model(dataset_id: str, selection_id: str, project_id: str, task_type: str):
+def train_model(dataset_id: str, selection_id: str, project_id: str, task_type: str, search: Optional[dict] = None, backtest: Optional[dict] = None, fast_path: Optional[dict] = None, fan_out: Optional[dict] = None):
+    """
+    Train an XGBoost model on the selected features.
+
+    When `search` is given (mode, param_space, n_trials, ...), a parallel random or
+    successive-halving search runs on a validation split carved from the training
+    rows, and only the best trial's model is evaluated, saved and uploaded.
+    When `backtest` is given (n_splits, window, ...), the chosen parameters are also
+    evaluated with walk-forward folds on `Date`, stored under metrics["backtest"].
+    When `fast_path` is given, a native Booster is trained with the `hist` tree method,
+    either from an in-memory QuantileDMatrix ("in_memory") or from chunked reads of
+    the feature table ("external_memory").
+    When `fan_out` is given (group_by, min_group_rows, ...), one model is trained per
+    device group plus a global fallback, and saved together as a GroupedModelBundle.
+    """
     try:
         # 1. Get Selection Metadata
         selection = get_feature_selection(selection_id)
@@ -598,187 +1008,716 @@ def train_model(dataset_id: str, selection_id: str, project_id: str, task_type:
         target = selection.target_column
         features = selection.selected_features
         
-        # 2. Load Data from Postgres
-        df = load_engineered_dataset(dataset_id)
-        
-        missing_feats = [f for f in features if f not in df.columns]
-        if missing_feats:
-             raise ValueError(f"Selected features missing from dataset: {missing_feats}")
-        if target not in df.columns:
-             raise ValueError(f"Target column {target} missing from dataset")
-             
-        X = df[features]
-        y = df[target]
-        
-        # 3. Train with XGBoost
-        from sklearn.model_selection import train_test_split
-        from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, r2_score, precision_score, recall_score, mean_absolute_error
-        import xgboost as xgb
-        import pickle
-        
-        X = X.fillna(0) 
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        metrics = {}
-        if task_type == 'classification':
-            model = xgb.XGBClassifier(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42,
-                eval_metric='logloss'
-            )
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            metrics['accuracy'] = accuracy_score(y_test, preds)
-            metrics['f1'] = f1_score(y_test, preds, average='weighted')
-            metrics['precision'] = precision_score(y_test, preds, average='weighted', zero_division=0)
-            metrics['recall'] = recall_score(y_test, preds, average='weighted', zero_division=0)
+        fast_mode = (fast_path or {}).get("mode")
+        if fast_mode and fast_mode not in ("in_memory", "external_memory"):
+            raise ValueError(f"Unsupported fast_path mode '{fast_mode}'. Expected 'in_memory' or 'external_memory'")
+        if fast_mode and search:
+            raise ValueError("Hyperparameter search cannot be combined with the fast training path")
+        if fan_out and (fast_mode or search):
+            raise ValueError("Per-group fan-out training cannot be combined with search or the fast training path")
+
+        search_result = None
+        model_params = {}
+        if fast_mode == "external_memory":
+            if backtest:
+                raise ValueError("Walk-forward backtesting needs the dataset in memory, use the 'in_memory' fast path")
+            # 2-3. Train straight from chunked reads, the table is never fully loaded
+            model, metrics = _train_external_memory(dataset_id, task_type, features, target, fast_path)
+            training_cutoff = _max_table_date(dataset_id)
+            table_columns = inspect(engine).get_columns(get_engineered_table_name(dataset_id))
+            dtypes = {c["name"]: str(c["type"]) for c in table_columns if c["name"] in features}
         else:
-            model = xgb.XGBRegressor(
-                n_estimators=100,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42
-            )
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            metrics['rmse'] = np.sqrt(mean_squared_error(y_test, preds))
-            metrics['mae'] = mean_absolute_error(y_test, preds)
-            metrics['r2'] = r2_score(y_test, preds)
-
-        # 4. Save Model Artifact as pickle
+            # 2. Load Data from Postgres
+            df = load_engineered_dataset(dataset_id)
+            
+            missing_feats = [f for f in features if f not in df.columns]
+            if missing_feats:
+                 raise ValueError(f"Selected features missing from dataset: {missing_feats}")
+            if target not in df.columns:
+                 raise ValueError(f"Target column {target} missing from dataset")
+                 
+            X = df[features]
+            y = df[target]
+            training_cutoff = _max_date(df)
+            dtypes = {f: str(df[f].dtype) for f in features}
+            
+            # 3. Train with XGBoost
+            if fast_mode:
+                model, metrics = _train_in_memory_fast_path(task_type, X, y, features, fast_path)
+            elif fan_out:
+                model, metrics = _train_group_bundle(task_type, df, X, y, features, fan_out)
+            else:
+                from sklearn.model_selection import train_test_split
+                
+                X_train, X_test, y_train, y_test = train_test_split(X.fillna(0), y, test_size=0.2, random_state=42)
+                
+                if search:
+                    model, search_result = _run_hyperparameter_search(task_type, X_train, y_train, search)
+                    best = search_result[0]
+                    model_params = {**best.params, "n_estimators": best.n_estimators}
+                else:
+                    model = build_estimator(task_type)
+                    model.fit(X_train, y_train)
+
+                preds = model.predict(X_test)
+                metrics = evaluate_predictions(task_type, y_test, preds)
+
+            if backtest:
+                metrics["backtest"] = _run_walk_forward_backtest(task_type, df, X, y, backtest, model_params)
+
+        # 4-6. Save artifact, upload to COS and record metadata
         model_id = str(uuid.uuid4())
-        artifact_path = os.path.join(MODEL_DIR, f"{model_id}.pkl")
-        with open(artifact_path, 'wb') as f:
-            pickle.dump(model, f)
-        logger.info(f"Model artifact saved locally: {artifact_path}")
-
-        # 5. Upload Model to COS
-        cos_path = upload_model_to_cos(model, model_id)
-        if cos_path:
-            logger.info(f"Model uploaded to COS: {cos_path}")
-        else:
-            logger.warning(f"COS upload failed, model only available locally")
-
-        # 6. Save Model Metadata
-        save_model_metadata(
-            model_id, 
-            f"{task_type.title()}Model-{model_id[:6]}", 
-            project_id, 
-            dataset_id, 
-            selection_id, 
-            task_type, 
-            target, 
-            metrics,
-            artifact_path=artifact_path,
-            cos_path=cos_path
+        _save_trained_model(
+            model, model_id, project_id, dataset_id, selection_id, task_type, target, metrics,
+            features, dtypes,
+            training_cutoff=training_cutoff
         )
         
+        if search_result:
+            best, trials, mode = search_result
+            search_id = str(uuid.uuid4())
+            save_hyperparameter_trials(search_id, project_id, dataset_id, model_id, mode, trials, best)
+            search_result = {
+                "search_id": search_id,
+                "mode": mode,
+                "n_trials": len(trials),
+                "best_params": best.params,
+                "best_iteration": best.best_iteration
+            }
+
         logger.info(f"XGBoost model trained {model_id} with metrics {metrics}")
         
-        return {
+        response = {
             "model_id": model_id,
             "metrics": metrics
         }
+        if search_result:
+            response["search"] = search_result
+        return response
     except Exception as e:
         logger.error(f"Training Failed: {e}", exc_info=True)
         raise ValueError(f"Model training failed: {str(e)}")
 
 
-def run_prediction(model_id: str, dataset_id: str, project_id: str):
+def _save_trained_model(model: Any, model_id: str, project_id: str, dataset_id: str, selection_id: str, task_type: str, target: str, metrics: dict, features: list, dtypes: dict, **lineage):
+    """Save the model artifact locally, record its metadata and queue the COS upload."""
+    # Save Model Artifact in the native format with its manifest
+    artifact_path, manifest = save_model_artifact(
+        model, MODEL_DIR, model_id, task_type, features, target, dtypes,
+        compression=MODEL_ARTIFACT_COMPRESSION
+    )
+    logger.info(f"Model artifact saved locally: {artifact_path} ({manifest['size_bytes']} bytes)")
+
+    # Save Model Metadata
+    save_model_metadata(
+        model_id, 
+        f"{task_type.title()}Model-{model_id[:6]}", 
+        project_id, 
+        dataset_id, 
+        selection_id, 
+        task_type, 
+        target, 
+        metrics,
+        artifact_path=artifact_path,
+        artifact_checksum=manifest["sha256"],
+        upload_state="pending",
+        **lineage
+    )
+
+    # Upload Model to COS in the background; the model is usable locally right away
+    upload_queue.enqueue(model_id)
+    return artifact_path
+
+
+def _max_date(df: pd.DataFrame) -> Optional[datetime]:
+    if "Date" not in df.columns or df.empty:
+        return None
+    latest = pd.to_datetime(df["Date"]).max()
+    return None if pd.isna(latest) else latest.to_pydatetime()
+
+
+def _max_table_date(dataset_id: str) -> Optional[datetime]:
+    table_name = get_engineered_table_name(dataset_id)
+    if "Date" not in {c["name"] for c in inspect(engine).get_columns(table_name)}:
+        return None
+    with engine.connect() as conn:
+        latest = conn.execute(text(f'SELECT MAX("Date") FROM "{table_name}"')).scalar()
+    return None if latest is None else pd.Timestamp(latest).to_pydatetime()
+
+
+# Share of the new dates (latest first) a warm-start retrain evaluates on instead of boosting on
+RETRAIN_HOLDOUT_FRACTION = 0.2
+
+def retrain_model(project_id: str, model_id: str, dataset_id: Optional[str] = None, n_estimators: int = 50):
+    """
+    Warm-start a new model from an existing one by continuing to boost its booster
+    (XGBoost `xgb_model`) on only the rows dated after the parent's training cutoff.
+    The latest of those dates are held out for evaluation and left after the new cutoff.
+    The new model records its parent and the number of rows added.
+    """
     try:
-        # 1. Get Model Metadata
-        session = SessionLocal()
-        try:
-             model_entry = session.query(TrainedModel).filter_by(id=model_id).first()
-        finally:
-             session.close()
-             
-        if not model_entry or not model_entry.artifact_path:
-             raise ValueError(f"Model {model_id} not found or has no artifact.")
-        
-        # 2. Get Selection Metadata
-        selection = get_feature_selection(model_entry.selection_id)
+        parent = get_model_entry(model_id, project_id)
+        if not parent:
+            raise ValueError(f"Model {model_id} not found in project {project_id}")
+        if not parent.training_cutoff:
+            raise ValueError(f"Model {model_id} has no recorded training cutoff to retrain from")
+
+        selection = get_feature_selection(parent.selection_id)
         if not selection:
-             raise ValueError("Feature selection metadata missing for model.")
-             
-        # 3. Load Data & Model
+            raise ValueError("Feature selection metadata missing for model.")
+        features, target = selection.selected_features, parent.target_column
+
+        parent_model = _load_model(parent)
+        if isinstance(parent_model, GroupedModelBundle):
+            raise ValueError("Warm-start retraining is not supported for per-group model bundles")
+
+        # Only rows added since the parent was trained
+        dataset_id = dataset_id or parent.dataset_id
         df = load_engineered_dataset(dataset_id)
+        if "Date" not in df.columns:
+            raise ValueError("Warm-start retraining requires a 'Date' column in the engineered dataset")
+        missing_feats = [f for f in features + [target] if f not in df.columns]
+        if missing_feats:
+            raise ValueError(f"Dataset missing columns required by model: {missing_feats}")
+
+        new_rows = df[pd.to_datetime(df["Date"]) > parent.training_cutoff]
+        if new_rows.empty:
+            raise ValueError(f"No rows added after {parent.training_cutoff.isoformat()}, nothing to retrain on")
+
+        # Evaluate on the latest dates and boost on the earlier ones. Whole dates go to one
+        # side, so the cutoff (the last trained date) leaves the held-out rows for the next retrain.
+        new_dates = pd.to_datetime(new_rows["Date"])
+        distinct_dates = np.sort(new_dates.unique())
+        if len(distinct_dates) > 1:
+            n_holdout_dates = max(1, int(len(distinct_dates) * RETRAIN_HOLDOUT_FRACTION))
+            is_holdout = (new_dates >= distinct_dates[-n_holdout_dates]).to_numpy()
+        else:
+            # A single new date can't be split in time: boost on all of it, metrics are in-sample
+            logger.warning(f"Only one new date after {parent.training_cutoff.isoformat()}, retrain metrics are in-sample")
+            is_holdout = np.zeros(len(new_rows), dtype=bool)
+        train_rows = new_rows[~is_holdout]
+        eval_rows = new_rows[is_holdout] if is_holdout.any() else train_rows
+
+        model = _continue_boosting(parent_model, parent.task_type, train_rows[features].fillna(0), train_rows[target], n_estimators)
+        metrics = evaluate_predictions(
+            parent.task_type, eval_rows[target], predict_with_model(model, eval_rows[features].fillna(0), parent.task_type)
+        )
+
+        new_model_id = str(uuid.uuid4())
+        _save_trained_model(
+            model, new_model_id, project_id, dataset_id, parent.selection_id, parent.task_type, target, metrics,
+            features, {f: str(new_rows[f].dtype) for f in features},
+            training_cutoff=_max_date(train_rows),
+            parent_model_id=model_id,
+            rows_added=len(train_rows)
+        )
+        logger.info(f"Model {new_model_id} warm-started from {model_id} on {len(train_rows)} new rows with metrics {metrics}")
+
+        return {
+            "model_id": new_model_id,
+            "parent_model_id": model_id,
+            "rows_added": len(train_rows),
+            "holdout_rows": int(is_holdout.sum()),
+            "metrics": metrics
+        }
+    except Exception as e:
+        logger.error(f"Retraining Failed: {e}", exc_info=True)
+        raise ValueError(f"Model retraining failed: {str(e)}")
+
+
+def _continue_boosting(parent_model: Any, task_type: str, X: pd.DataFrame, y: pd.Series, n_estimators: int):
+    """Add `n_estimators` boosting rounds on top of the parent's trees."""
+    import xgboost as xgb
+    from backend.services.modeling import booster_params
+
+    if isinstance(parent_model, xgb.Booster):
+        # Keep the parent's tree parameters, saved with the booster's config
+        config = json.loads(parent_model.save_config())
+        n_classes = int(config["learner"]["learner_model_param"].get("num_class", "0")) or 2
+        tree_params = config["learner"].get("gradient_booster", {}).get("tree_train_param", {})
+        inherited = {
+            name: float(tree_params[name])
+            for name in ("learning_rate", "subsample", "colsample_bytree", "min_child_weight")
+            if name in tree_params
+        }
+        if "max_depth" in tree_params:
+            inherited["max_depth"] = int(tree_params["max_depth"])
+
+        dtrain = xgb.QuantileDMatrix(to_float32_matrix(X), label=y.to_numpy(), feature_names=list(X.columns))
+        params = booster_params(task_type, inherited, n_classes=n_classes)
+        return xgb.train(params, dtrain, num_boost_round=n_estimators, xgb_model=parent_model)
+
+    model = type(parent_model)(**parent_model.get_params())
+    # Early stopping needs an eval set the continuation does not have
+    model.set_params(n_estimators=n_estimators, early_stopping_rounds=None, n_jobs=None)
+    model.fit(X, y, xgb_model=parent_model.get_booster())
+    return model
+
+
+def _run_hyperparameter_search(task_type: str, X_train: pd.DataFrame, y_train: pd.Series, search: dict):
+    """
+    Split a validation set off the training rows and run the configured search.
+    Returns the best model and (best_trial, trials, mode) for persistence.
+    """
+    from sklearn.model_selection import train_test_split
+    from backend.services.hyperparameter_search import run_search
+
+    mode = search.get("mode") or "random"
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train,
+        test_size=search.get("validation_size") or 0.2,
+        random_state=42
+    )
+
+    best, trials = run_search(
+        task_type,
+        X_fit, y_fit, X_val, y_val,
+        mode=mode,
+        param_space=search.get("param_space"),
+        n_trials=search.get("n_trials") or 20,
+        max_estimators=search.get("max_estimators") or 500,
+        early_stopping_rounds=search.get("early_stopping_rounds") or 20,
+        eta=search.get("eta") or 3,
+        n_jobs=search.get("n_jobs") or -1,
+    )
+    # Trials ran single-threaded, let the winning model predict with all cores
+    best.model.set_params(n_jobs=None)
+    logger.info(f"Hyperparameter search ({mode}) finished: {len(trials)} trials, best score {best.score:.4f} with {best.params}")
+    return best.model, (best, trials, mode)
+
+
+def _train_in_memory_fast_path(task_type: str, X: pd.DataFrame, y: pd.Series, features: list, fast_path: dict):
+    """
+    Convert the features to one float32 buffer and train a hist Booster from a
+    QuantileDMatrix on 80% of it, evaluating on the remaining 20%.
+    """
+    from backend.services.modeling import train_booster
+
+    X_np = to_float32_matrix(X)
+    y_np = y.to_numpy()
+    test_mask = np.random.default_rng(42).random(len(y_np)) < 0.2
+
+    booster = train_booster(
+        task_type, X_np[~test_mask], y_np[~test_mask], features,
+        nthread=fast_path.get("nthread"),
+        max_bin=fast_path.get("max_bin") or 256,
+    )
+    preds = predict_with_model(booster, X_np[test_mask], task_type)
+    return booster, evaluate_predictions(task_type, y_np[test_mask], preds)
+
+
+def _train_group_bundle(task_type: str, df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, features: list, fan_out: dict):
+    """
+    Train a global fallback model and one model per `group_by` group on the same 80%
+    split, then evaluate the routed bundle on the remaining 20%.
+    """
+    from backend.services.model_bundle import train_group_models
+
+    group_by = fan_out.get("group_by") or ["Type", "Application"]
+    missing = [c for c in group_by if c not in df.columns]
+    if missing:
+        raise ValueError(f"Group columns missing from dataset: {missing}")
+
+    X_np = to_float32_matrix(X)
+    y_np = y.to_numpy()
+    test_mask = np.random.default_rng(42).random(len(y_np)) < 0.2
+    train_idx = np.flatnonzero(~test_mask)
+
+    fallback = build_estimator(task_type)
+    fallback.fit(X_np[train_idx], y_np[train_idx])
+
+    grouped = df.groupby(group_by, sort=True, dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    keys = [k if isinstance(k, tuple) else (k,) for k in grouped.size().index]
+
+    models, summary = train_group_models(
+        task_type,
+        X_np[train_idx],
+        y_np[train_idx],
+        codes[train_idx],
+        keys,
+        min_group_rows=fan_out.get("min_group_rows") or 50,
+        n_jobs=fan_out.get("n_jobs") or -1,
+    )
+    bundle = GroupedModelBundle(task_type, features, group_by, models, fallback)
+
+    test_df = df.iloc[np.flatnonzero(test_mask)]
+    metrics = evaluate_predictions(task_type, y_np[test_mask], bundle.predict(test_df))
+    metrics["fan_out"] = {"group_by": group_by, **summary}
+    return bundle, metrics
+
+
+def _score_frame(model: Any, df: pd.DataFrame, features: list, task_type: str):
+    """Score a frame with a single model, or route rows through a per-group bundle."""
+    if isinstance(model, GroupedModelBundle):
+        return model.predict(df)
+    return predict_with_model(model, df[features].fillna(0), task_type)
+
+
+def _train_external_memory(dataset_id: str, task_type: str, features: list, target: str, fast_path: dict):
+    """
+    Train a hist Booster from chunked reads of the engineered table. XGBoost pages the
+    quantized data through an on-disk cache, so memory use is bounded by the chunk size.
+    """
+    from backend.services.modeling import train_booster_external_memory
+
+    table_name = get_engineered_table_name(dataset_id)
+    table_columns = {c["name"] for c in inspect(engine).get_columns(table_name)}
+    missing_feats = [f for f in features if f not in table_columns]
+    if missing_feats:
+        raise ValueError(f"Selected features missing from dataset: {missing_feats}")
+    if target not in table_columns:
+        raise ValueError(f"Target column {target} missing from dataset")
+
+    n_classes = 2
+    if task_type == 'classification':
+        with engine.connect() as conn:
+            max_label = conn.execute(text(f'SELECT MAX("{target}") FROM "{table_name}"')).scalar()
+        n_classes = int(max_label or 0) + 1
+
+    # The holdout is picked by a hash of the row's device and date, so it is the same
+    # whichever order the table is scanned in and no sort is needed on each pass
+    holdout_key = [c for c in ["Date"] + DEVICE_KEY_COLS if c in table_columns] or None
+    columns = list(dict.fromkeys(features + [target] + (holdout_key or [])))
+    chunk_size = fast_path.get("chunk_size") or 100_000
+    booster, X_holdout, y_holdout = train_booster_external_memory(
+        task_type,
+        lambda: iter_engineered_dataset(dataset_id, columns, chunk_size),
+        features,
+        target,
+        n_classes=n_classes,
+        nthread=fast_path.get("nthread"),
+        max_bin=fast_path.get("max_bin") or 256,
+        holdout_key=holdout_key,
+    )
+    if len(y_holdout) == 0:
+        raise ValueError("Engineered dataset is empty")
+
+    preds = predict_with_model(booster, X_holdout, task_type)
+    return booster, evaluate_predictions(task_type, y_holdout, preds)
+
+
+def _run_walk_forward_backtest(task_type: str, df: pd.DataFrame, X: pd.DataFrame, y: pd.Series, backtest: dict, params: dict):
+    """
+    Sort the already-loaded feature matrix by `Date` once and hand it to the
+    backtesting engine, which shares that single buffer across all fold workers.
+    """
+    from backend.services.backtesting import run_backtest
+
+    if "Date" not in df.columns:
+        raise ValueError("Walk-forward backtesting requires a 'Date' column in the engineered dataset")
+
+    dates = pd.to_datetime(df["Date"]).to_numpy()
+    order = np.argsort(dates, kind="stable")
+
+    return run_backtest(
+        task_type,
+        to_float32_matrix(X)[order],
+        y.to_numpy()[order],
+        dates[order],
+        n_splits=backtest.get("n_splits") or 5,
+        window=backtest.get("window") or "expanding",
+        train_periods=backtest.get("train_periods"),
+        test_periods=backtest.get("test_periods"),
+        gap_periods=backtest.get("gap_periods") or 0,
+        params=params,
+        n_jobs=backtest.get("n_jobs") or -1,
+    )
+
+
+# Keyed by (model_id, artifact_checksum) so a re-saved artifact never serves a stale model
+model_cache = LRUCache(max_entries=MODEL_CACHE_MAX_ENTRIES, ttl_seconds=MODEL_CACHE_TTL_SECONDS or None)
+
+def invalidate_model_cache(model_id: str) -> int:
+    return model_cache.invalidate(lambda key: key[0] == model_id)
+
+
+def _load_model(model_entry: TrainedModel) -> Any:
+    """Load a model artifact - in-process cache first, then COS, fallback to local file."""
+    cache_key = (model_entry.id, model_entry.artifact_checksum or model_entry.artifact_path)
+    model = model_cache.get(cache_key)
+    if model is not None:
+        logger.info(f"Model {model_entry.id} served from the in-process model cache")
+        return model
+    
+    # Try COS if path is available
+    if model_entry.cos_path:
+        logger.info(f"Attempting to load model from COS: {model_entry.cos_path}")
+        model = download_model_from_cos(model_entry.cos_path, model_entry.artifact_checksum)
         
-        # Load model - try COS first, fallback to local file
-        model = None
-        
-        # Try COS if path is available
-        if model_entry.cos_path:
-            logger.info(f"Attempting to load model from COS: {model_entry.cos_path}")
-            model = download_model_from_cos(model_entry.cos_path)
-            
-            if model:
-                logger.info(f"✅ Model loaded from COS successfully")
-            else:
-                logger.warning(f"⚠️ COS download failed, falling back to local file")
-        
-        # Fallback to local file
-        if not model and model_entry.artifact_path:
-            logger.info(f"Loading model from local file: {model_entry.artifact_path}")
-            with open(model_entry.artifact_path, 'rb') as f:
-                model = pickle.load(f)
-            logger.info(f"✅ Model loaded from local file successfully")
-        
-        if not model:
-            raise ValueError(f"Failed to load model from both COS and local storage")
-        
-        # Prepare Features
-        features = selection.selected_features
-        missing = [f for f in features if f not in df.columns]
+        if model:
+            logger.info(f"✅ Model loaded from COS successfully")
+        else:
+            logger.warning(f"⚠️ COS download failed, falling back to local file")
+    
+    # Fallback to local file
+    if not model and model_entry.artifact_path and os.path.exists(model_entry.artifact_path):
+        logger.info(f"Loading model from local file: {model_entry.artifact_path}")
+        model = load_model_artifact(model_entry.artifact_path)
+        logger.info(f"✅ Model loaded from local file successfully")
+    
+    if not model:
+        raise ValueError(f"Failed to load model from both COS and local storage")
+    model_cache.put(cache_key, model)
+    return model
+
+
+def _iter_scoring_chunks(dataset_id: str, columns: Optional[list], chunksize: int, con=None) -> Iterator[pd.DataFrame]:
+    """
+    Chunks of the engineered table restricted to `columns` (all when None): row slices of
+    the cached frame when this version is already in memory, otherwise streamed from the database.
+    """
+    cached = dataset_cache.get((dataset_id, get_engineered_version(dataset_id)))
+    if cached is not None:
+        for start in range(0, len(cached), chunksize):
+            chunk = cached.iloc[start:start + chunksize]
+            yield chunk if columns is None else chunk[columns]
+        return
+    yield from iter_engineered_dataset(dataset_id, columns=columns, chunksize=chunksize, con=con)
+
+def _get_prediction_model_entry(model_id: str, project_id: Optional[str] = None) -> tuple:
+    """
+    (model_entry, selected features) for a batch prediction, without loading the model.
+    With `project_id`, the model must belong to that project.
+    """
+    session = SessionLocal()
+    try:
+         query = session.query(TrainedModel).filter_by(id=model_id)
+         if project_id is not None:
+             query = query.filter_by(project_id=project_id)
+         model_entry = query.first()
+    finally:
+         session.close()
+         
+    if not model_entry or not model_entry.artifact_path:
+         raise ValueError(f"Model {model_id} not found or has no artifact.")
+    
+    selection = get_feature_selection(model_entry.selection_id)
+    if not selection:
+         raise ValueError("Feature selection metadata missing for model.")
+    return model_entry, list(selection.selected_features)
+
+def _load_prediction_model(model_id: str, project_id: Optional[str] = None) -> tuple:
+    """(model_entry, selected features, loaded model) for a batch prediction."""
+    model_entry, features = _get_prediction_model_entry(model_id, project_id)
+    return model_entry, features, _load_model(model_entry)
+
+def _find_memoized_prediction(project_id: str, model_id: str, dataset_id: str, artifact_checksum: str, dataset_version: int):
+    """
+    A completed run of the same model artifact on the same engineered dataset version
+    whose result table still exists, or None.
+    """
+    db = SessionLocal()
+    try:
+        runs = db.query(PredictionRun).filter_by(
+            project_id=project_id, model_id=model_id, dataset_id=dataset_id,
+            artifact_checksum=artifact_checksum, dataset_version=dataset_version, status="completed",
+            ensemble_id=None
+        ).order_by(PredictionRun.created_at.desc()).all()
+    finally:
+        db.close()
+    inspector = inspect(engine)
+    for run in runs:
+        if run.output_path and inspector.has_table(run.output_path):
+            return run
+    return None
+
+def _preview_prediction_table(table_name: str) -> list:
+    """First rows of a result table, read back the same way for fresh and memoized runs."""
+    return pd.read_sql(text(f"SELECT * FROM {table_name} LIMIT 5"), engine).to_dict(orient='records')
+
+def _write_scored_chunks(prediction_id: str, dataset_id: str, columns: list, key_cols: list, pred_cols: list, score_chunk) -> dict:
+    """
+    Stream `columns` of the engineered table in chunks, score each with
+    `score_chunk(chunk) -> DataFrame of pred_cols`, and append keys plus predictions to
+    `pred_res_{prediction_id}`. Reads and writes share one connection (SQLite can't
+    write beside an open read cursor) and the table is committed once, after the last chunk.
+    The read uses a server-side cursor, so only the current chunk is held client-side.
+    """
+    started = time.perf_counter()
+    rows_scored = 0
+    # stream_results only switches SELECTs to a server-side cursor, the inserts are unaffected
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in _iter_scoring_chunks(dataset_id, columns, PREDICTION_CHUNK_SIZE, conn):
+            preds = score_chunk(chunk)
+            out = pd.concat([chunk[key_cols], preds], axis=1)
+            table_name = save_prediction_result_table(prediction_id, out, if_exists='replace' if rows_scored == 0 else 'append', con=conn)
+            rows_scored += len(chunk)
+
+        if rows_scored == 0:
+            table_name = save_prediction_result_table(prediction_id, pd.DataFrame(columns=key_cols + pred_cols), con=conn)
+        conn.commit()
+
+    elapsed = time.perf_counter() - started
+    rows_per_second = rows_scored / elapsed if elapsed > 0 else None
+    logger.info(f"Prediction saved to table {table_name}: {rows_scored} rows at {rows_per_second or 0:.0f} rows/s")
+    return {"output_table": table_name, "preview": _preview_prediction_table(table_name), "rows_scored": rows_scored, "rows_per_second": rows_per_second}
+
+def run_prediction(model_id: str, dataset_id: str, project_id: str, force: bool = False):
+    try:
+        # 1. Get Model & Selection Metadata
+        model_entry, features = _get_prediction_model_entry(model_id, project_id)
+
+        # Same artifact on the same dataset version: reuse the earlier result unless forced
+        dataset_version = get_engineered_version(dataset_id)
+        if not force and model_entry.artifact_checksum and dataset_version is not None:
+            run = _find_memoized_prediction(project_id, model_id, dataset_id, model_entry.artifact_checksum, dataset_version)
+            if run is not None:
+                logger.info(f"Reusing prediction {run.id} for model {model_id} on dataset {dataset_id} v{dataset_version}")
+                return {
+                    "prediction_id": run.id,
+                    "status": "completed",
+                    "output_table": run.output_path,
+                    "preview": _preview_prediction_table(run.output_path),
+                    "rows_scored": run.rows_scored,
+                    "rows_per_second": run.rows_per_second,
+                    "memoized": True,
+                }
+
+        model = _load_model(model_entry)
+             
+        # 2. Check the table's columns without reading its rows
+        table_name = get_engineered_table_name(dataset_id)
+        available = [c["name"] for c in inspect(engine).get_columns(table_name)]
+        missing = [f for f in features if f not in available]
         if missing:
              raise ValueError(f"Dataset missing features required by model: {missing}")
-        
-        X = df[features].fillna(0)
-        
-        # 4. Predict
-        preds = model.predict(X)
-        
-        # 5. Create Result DataFrame
-        result_df = df.copy()
+
+        # Read only what is scored or written back: device keys, target and features
         pred_col = f"predicted_{model_entry.target_column}"
-        result_df[pred_col] = preds
+        key_cols = [c for c in ["Date"] + DEVICE_KEY_COLS if c in available]
+        if model_entry.target_column in available:
+            key_cols.append(model_entry.target_column)
+        extra = list(model.group_cols) if isinstance(model, GroupedModelBundle) else []
+        columns = list(dict.fromkeys(key_cols + extra + features))
         
-        # Filter for minimal output (Target + Predicted only)
-        cols_to_keep = [pred_col]
-        # Include original target if it exists for comparison
-        if model_entry.target_column in df.columns:
-            cols_to_keep.insert(0, model_entry.target_column)
-            
-        final_df = result_df[cols_to_keep]
-        
-        # 6. Save to Postgres
+        # 3. Predict chunk by chunk, appending keys, target and prediction to the result table
+        def _score(chunk: pd.DataFrame) -> pd.DataFrame:
+            preds = _score_frame(model, chunk, features, model_entry.task_type)
+            return pd.DataFrame({pred_col: preds}, index=chunk.index)
+
         prediction_id = str(uuid.uuid4())
-        table_name = save_prediction_result_table(prediction_id, final_df)
-        logger.info(f"Prediction saved to table {table_name}")
+        result = _write_scored_chunks(prediction_id, dataset_id, columns, key_cols, [pred_col], _score)
+
+        # A re-engineer during scoring leaves rows of either version: don't memoize that run
+        if get_engineered_version(dataset_id) != dataset_version:
+            logger.warning(f"Dataset {dataset_id} changed while prediction {prediction_id} was scoring, not memoizing it")
+            dataset_version = None
         
-        # 7. Record Run
+        # 4. Record Run
         save_prediction_run(
             run_id=prediction_id, 
             project_id=project_id, 
             model_id=model_id, 
             dataset_id=dataset_id, 
             status="completed", 
-            output_path=table_name 
+            output_path=result["output_table"],
+            rows_scored=result["rows_scored"],
+            rows_per_second=result["rows_per_second"],
+            artifact_checksum=model_entry.artifact_checksum,
+            dataset_version=dataset_version
         )
         
+        return {"prediction_id": prediction_id, "status": "completed", **result, "memoized": False}
+        
+    except Exception as e:
+        logger.error(f"Prediction Failed: {e}", exc_info=True)
+        raise ValueError(f"Prediction failed: {str(e)}")
+
+ENSEMBLE_AGGREGATES = ("mean", "vote")
+
+def run_ensemble_prediction(model_ids: list, dataset_id: str, project_id: str, aggregate: Optional[str] = None):
+    """
+    Score several models on one dataset in a single pass and write one wide table.
+
+    The union of the models' features is read once per chunk and converted to one
+    float32 matrix; each model scores its own column subset of that matrix. With
+    `aggregate`, an `ensemble` column holds the mean prediction or, for
+    classification, the majority vote.
+    """
+    try:
+        model_ids = list(dict.fromkeys(model_ids))
+        if len(model_ids) < 2:
+            raise ValueError("An ensemble needs at least two distinct models")
+        if aggregate is not None and aggregate not in ENSEMBLE_AGGREGATES:
+            raise ValueError(f"Unsupported aggregate '{aggregate}'. Expected one of {list(ENSEMBLE_AGGREGATES)}")
+
+        loaded = [_load_prediction_model(mid, project_id) for mid in model_ids]
+        task_types = {entry.task_type for entry, _, _ in loaded}
+        if aggregate and len(task_types) > 1:
+            raise ValueError("Models of different task types can't be aggregated")
+        if aggregate == "vote" and task_types != {'classification'}:
+            raise ValueError("Majority vote is only defined for classification models")
+
+        table_name = get_engineered_table_name(dataset_id)
+        available = [c["name"] for c in inspect(engine).get_columns(table_name)]
+        union = list(dict.fromkeys(f for _, features, _ in loaded for f in features))
+        missing = [f for f in union if f not in available]
+        if missing:
+            raise ValueError(f"Dataset missing features required by models: {missing}")
+
+        key_cols = [c for c in ["Date"] + DEVICE_KEY_COLS if c in available]
+        key_cols += [t for t in dict.fromkeys(entry.target_column for entry, _, _ in loaded) if t in available and t not in key_cols]
+        extra = [c for _, _, model in loaded if isinstance(model, GroupedModelBundle) for c in model.group_cols]
+        columns = list(dict.fromkeys(key_cols + extra + union))
+
+        # One result column per model, short ids unless they collide
+        short = [mid[:8] for mid in model_ids]
+        pred_cols = [f"pred_{s}" for s in short] if len(set(short)) == len(short) else [f"pred_{mid}" for mid in model_ids]
+        positions = {f: i for i, f in enumerate(union)}
+        subsets = [[positions[f] for f in features] for _, features, _ in loaded]
+        if aggregate:
+            pred_cols = pred_cols + ["ensemble"]
+
+        def _score(chunk: pd.DataFrame) -> pd.DataFrame:
+            X = to_float32_matrix(chunk[union])
+            out = {}
+            for col, (entry, _, model), idx in zip(pred_cols, loaded, subsets):
+                if isinstance(model, GroupedModelBundle):
+                    out[col] = model.predict(chunk)
+                else:
+                    out[col] = predict_with_model(model, X[:, idx], entry.task_type)
+            if aggregate:
+                stacked = np.column_stack(list(out.values()))
+                if aggregate == "mean":
+                    out["ensemble"] = stacked.mean(axis=1)
+                else:
+                    # Majority label per row; ties go to the smallest label
+                    labels = stacked.astype(np.int64)
+                    n_labels = int(labels.max()) + 1 if labels.size else 1
+                    votes = np.stack([(labels == k).sum(axis=1) for k in range(n_labels)], axis=1)
+                    out["ensemble"] = votes.argmax(axis=1)
+            return pd.DataFrame(out, index=chunk.index)
+
+        prediction_id = str(uuid.uuid4())
+        result = _write_scored_chunks(prediction_id, dataset_id, columns, key_cols, pred_cols, _score)
+
+        # One run per model, so runs stay findable by model_id; they share the output table
+        # and are grouped under the prediction id
+        for mid in model_ids:
+            save_prediction_run(
+                run_id=str(uuid.uuid4()),
+                project_id=project_id,
+                model_id=mid,
+                dataset_id=dataset_id,
+                status="completed",
+                output_path=result["output_table"],
+                rows_scored=result["rows_scored"],
+                rows_per_second=result["rows_per_second"],
+                ensemble_id=prediction_id
+            )
+
         return {
             "prediction_id": prediction_id,
             "status": "completed",
-            "output_table": table_name,
-            "preview": result_df.head(5).to_dict(orient='records')
+            "models": dict(zip(model_ids, pred_cols)),
+            "aggregate": aggregate,
+            **result,
         }
-        
+
     except Exception as e:
-        logger.error(f"Prediction Failed: {e}", exc_info=True)
-        raise ValueError(f"Prediction failed: {str(e)}")
+        logger.error(f"Ensemble Prediction Failed: {e}", exc_info=True)
+        raise ValueError(f"Ensemble prediction failed: {str(e)}")
 
 def delete_project(project_id: str):
     try:
@@ -802,25 +1741,517 @@ def get_prediction_csv(prediction_id: str):
         return None
 
 
+# ==========================
+# Online Scoring
+# ==========================
+
+latency = LatencyRegistry()
+
+@dataclass
+class ServingModel:
+    model_id: str
+    dataset_id: str
+    task_type: str
+    target_column: str
+    features: list
+    model: Any
+
+# Everything online scoring needs per model, so a warm request never touches the database
+serving_cache = LRUCache(max_entries=MODEL_CACHE_MAX_ENTRIES, ttl_seconds=MODEL_CACHE_TTL_SECONDS or None)
+
+def _get_serving_model(model_id: str, project_id: str) -> ServingModel:
+    handle = serving_cache.get((project_id, model_id))
+    if handle is not None:
+        return handle
+
+    model_entry = get_model_entry(model_id, project_id)
+    if not model_entry or not model_entry.artifact_path:
+        raise ValueError(f"Model {model_id} not found or has no artifact.")
+    selection = get_feature_selection(model_entry.selection_id)
+    if not selection:
+        raise ValueError("Feature selection metadata missing for model.")
+
+    handle = ServingModel(
+        model_id=model_id,
+        dataset_id=model_entry.dataset_id,
+        task_type=model_entry.task_type,
+        target_column=model_entry.target_column,
+        features=list(selection.selected_features),
+        model=_load_model(model_entry),
+    )
+    serving_cache.put((project_id, model_id), handle)
+    return handle
+
+online_feature_store = LatestFeatureStore(DEVICE_KEY_COLS)
+
+def get_online_table_name(dataset_id: str) -> str:
+    return f"online_{dataset_id.replace('-', '_')}"
+
+def _read_online_table(dataset_id: str) -> Optional[pd.DataFrame]:
+    table_name = get_online_table_name(dataset_id)
+    if not inspect(engine).has_table(table_name):
+        return None
+    return pd.read_sql_table(table_name, engine)
+
+def refresh_online_features(dataset_id: str, df_feat: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge the newest engineered row per device into the stored latest-row table and
+    return the merged frame. Devices absent from this run keep their previous row.
+    """
+    snapshot = online_feature_store.get(dataset_id)
+    current = snapshot.frame if snapshot is not None else _read_online_table(dataset_id)
+    if current is not None and list(current.columns) != list(df_feat.columns):
+        # Feature set changed, older rows can't be mixed in
+        current = None
+    merged = online_feature_store.merge(current, df_feat)
+    merged.to_sql(get_online_table_name(dataset_id), engine, if_exists='replace', index=False)
+    logger.info(f"Online feature store for {dataset_id} holds {len(merged)} devices")
+    return merged
+
+def get_online_snapshot(dataset_id: str):
+    """Latest-row snapshot for the dataset's current version, reloaded when another worker refreshed it."""
+    version = get_engineered_version(dataset_id)
+    snapshot = online_feature_store.get(dataset_id)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    frame = _read_online_table(dataset_id)
+    if frame is None:
+        if version is None:
+            raise ValueError(f"Engineered dataset {dataset_id} not found in registry")
+        # Datasets engineered before the store existed: build it once from the full table
+        frame = refresh_online_features(dataset_id, load_engineered_dataset(dataset_id))
+    return online_feature_store.install(dataset_id, frame, version)
+
+def _latest_device_rows(dataset_id: str, devices: list) -> tuple:
+    """Latest engineered row per requested device key. Returns (frame, found mask)."""
+    keys = [normalize_key(d.get(c) for c in DEVICE_KEY_COLS) for d in devices]
+    return get_online_snapshot(dataset_id).lookup(keys)
+
+def _online_predict(handle: ServingModel, frame: pd.DataFrame) -> tuple:
+    """Predictions and, for single models, the positive-class probability (classification only)."""
+    import xgboost as xgb
+
+    if isinstance(handle.model, GroupedModelBundle):
+        return handle.model.predict(frame), None
+    X = to_float32_matrix(frame.reindex(columns=handle.features))
+    if handle.task_type == 'classification' and isinstance(handle.model, xgb.Booster):
+        raw = handle.model.inplace_predict(X)
+        if raw.ndim == 2:
+            return raw.argmax(axis=1), raw.max(axis=1)
+        return (raw >= 0.5).astype(int), raw
+    return predict_with_model(handle.model, X, handle.task_type), None
+
+def score_online(project_id: str, model_id: str, instances: Optional[list] = None, devices: Optional[list] = None, dataset_id: Optional[str] = None):
+    """
+    Score a handful of rows against the in-memory model.
+
+    `instances` are feature vectors keyed by feature name (missing features count as 0,
+    as in training); when they are given, nothing is read from the database once the
+    model is warm. `devices` are {Type, Application, IP} keys scored on their latest
+    engineered row from `dataset_id` (defaults to the model's training dataset).
+    """
+    started = time.perf_counter()
+    try:
+        if bool(instances) == bool(devices):
+            raise ValueError("Provide exactly one of 'instances' or 'devices'")
+        n_rows = len(instances or devices)
+        if n_rows > ONLINE_MAX_INSTANCES:
+            raise ValueError(f"At most {ONLINE_MAX_INSTANCES} rows can be scored online, got {n_rows}")
+
+        with latency.timer("online.model"):
+            handle = _get_serving_model(model_id, project_id)
+
+        with latency.timer("online.features"):
+            if instances:
+                frame = pd.DataFrame.from_records(instances)
+                found = np.ones(n_rows, dtype=bool)
+            else:
+                frame, found = _latest_device_rows(dataset_id or handle.dataset_id, devices)
+
+        with latency.timer("online.predict"):
+            preds, proba = _online_predict(handle, frame)
+
+        results = []
+        for i in range(n_rows):
+            row = {"index": i}
+            if devices:
+                row.update({c: devices[i].get(c) for c in DEVICE_KEY_COLS})
+                row["found"] = bool(found[i])
+                if found[i] and "Date" in frame.columns:
+                    row["as_of"] = str(frame["Date"].iloc[i])
+            row["prediction"] = preds[i].item() if found[i] else None
+            if proba is not None:
+                row["probability"] = float(proba[i]) if found[i] else None
+            results.append(row)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        latency.histogram("online.total").observe(elapsed_ms)
+        return {
+            "model_id": model_id,
+            "task_type": handle.task_type,
+            "target_column": handle.target_column,
+            "predictions": results,
+            "latency_ms": elapsed_ms,
+        }
+    except Exception as e:
+        logger.error(f"Online scoring failed: {e}")
+        raise ValueError(f"Online scoring failed: {str(e)}")
+
+def score_fleet(project_id: str, model_id: str, dataset_id: Optional[str] = None):
+    """Score every device's current state in one vectorized pass over the online feature store."""
+    started = time.perf_counter()
+    try:
+        with latency.timer("fleet.model"):
+            handle = _get_serving_model(model_id, project_id)
+        with latency.timer("fleet.features"):
+            frame = get_online_snapshot(dataset_id or handle.dataset_id).frame
+        with latency.timer("fleet.predict"):
+            preds, proba = _online_predict(handle, frame)
+
+        cols = [c for c in DEVICE_KEY_COLS + ["Date"] if c in frame.columns]
+        result = frame[cols].copy()
+        if "Date" in result.columns:
+            result["Date"] = result["Date"].map(str)
+        result["prediction"] = preds
+        if proba is not None:
+            result["probability"] = proba
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        latency.histogram("fleet.total").observe(elapsed_ms)
+        return {
+            "model_id": model_id,
+            "task_type": handle.task_type,
+            "target_column": handle.target_column,
+            "devices": len(result),
+            "predictions": result.to_dict(orient="records"),
+            "latency_ms": elapsed_ms,
+        }
+    except Exception as e:
+        logger.error(f"Fleet scoring failed: {e}")
+        raise ValueError(f"Fleet scoring failed: {str(e)}")
+
+
+# ==========================
+# Scheduled Pipelines
+# ==========================
+
+PIPELINE_STAGES = ("ingest", "feature_refresh", "scoring")
+
+def _raw_table_ref(dataset_id: str) -> tuple:
+    """(table name, schema) of a dataset's raw table, as `save_raw_dataset` writes it."""
+    table_name = f"raw_{dataset_id.replace('-', '_')}"
+    schema = os.environ.get("DB_SCHEMA", "public") if engine.dialect.name == "postgresql" else None
+    return table_name, schema
+
+def _resolve_source_path(source_path: str) -> str:
+    """Real path of an ingest source, which must lie inside SCHEDULER_INGEST_DIR."""
+    root = os.path.realpath(SCHEDULER_INGEST_DIR)
+    path = os.path.realpath(os.path.join(root, source_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"source_path must be inside the ingest directory '{SCHEDULER_INGEST_DIR}'")
+    return path
+
+def _read_source_file(source_path: str) -> pd.DataFrame:
+    source_path = _resolve_source_path(source_path)
+    if source_path.endswith('.csv'):
+        return pd.read_csv(source_path)
+    if source_path.endswith(('.xls', '.xlsx')):
+        return pd.read_excel(source_path)
+    if source_path.endswith('.parquet'):
+        return pd.read_parquet(source_path)
+    raise ValueError("Unsupported source format. Only CSV, Excel and Parquet are supported.")
+
+def _date_watermarks(full_name: str, key_cols: list) -> pd.DataFrame:
+    """
+    Latest "Date" per device key (one row without keys), compared as dates: raw tables
+    often store it as text, whose MAX would compare strings.
+    """
+    group_by = ", ".join(f'"{c}"' for c in key_cols)
+    select_keys = f"{group_by}, " if key_cols else ""
+    if engine.dialect.name == "postgresql":
+        query = f'SELECT {select_keys}MAX(CAST("Date" AS TIMESTAMP)) AS watermark FROM {full_name}' + (f" GROUP BY {group_by}" if key_cols else "")
+        marks = pd.read_sql(text(query), engine)
+        marks["watermark"] = pd.to_datetime(marks["watermark"])
+        return marks
+    # No portable text-to-timestamp cast: parse the dates here instead
+    dates = pd.read_sql(text(f'SELECT {select_keys}"Date" FROM {full_name}'), engine)
+    dates["watermark"] = pd.to_datetime(dates.pop("Date"))
+    if not key_cols:
+        return pd.DataFrame({"watermark": [dates["watermark"].max()]})
+    return dates.groupby(key_cols, as_index=False, dropna=False)["watermark"].max()
+
+def ingest_incremental(dataset_id: str, source_path: str) -> int:
+    """
+    Append rows of `source_path` (relative to SCHEDULER_INGEST_DIR) that are newer than what the raw table already holds,
+    per device when the device key columns exist. Returns the number of rows appended.
+    """
+    table_name, schema = _raw_table_ref(dataset_id)
+    full_name = f'"{schema}"."{table_name}"' if schema else f'"{table_name}"'
+    incoming = _read_source_file(source_path)
+    if "Date" not in incoming.columns:
+        raise ValueError("Incremental ingest requires a 'Date' column in the source")
+    incoming_dates = pd.to_datetime(incoming["Date"])
+
+    key_cols = [c for c in DEVICE_KEY_COLS if c in incoming.columns]
+    marks = _date_watermarks(full_name, key_cols)
+
+    if key_cols:
+        keyed = incoming[key_cols].astype(str)
+        marks[key_cols] = marks[key_cols].astype(str)
+        watermark = keyed.merge(marks, on=key_cols, how="left")["watermark"].to_numpy()
+    else:
+        watermark = np.full(len(incoming), marks["watermark"].iloc[0] if len(marks) else pd.NaT)
+    watermark = pd.to_datetime(pd.Series(watermark))
+    new_rows = incoming[(watermark.isna() | (incoming_dates.to_numpy() > watermark.to_numpy())).to_numpy()]
+
+    if len(new_rows):
+        new_rows.to_sql(table_name, engine, if_exists='append', index=False, schema=schema)
+    logger.info(f"Ingested {len(new_rows)} new rows of {len(incoming)} into {table_name}")
+    return len(new_rows)
+
+def _schedule_to_dict(sched: PipelineSchedule) -> dict:
+    return {
+        "id": sched.id,
+        "project_id": sched.project_id,
+        "name": sched.name,
+        "cron": sched.cron,
+        "dataset_id": sched.dataset_id,
+        "model_id": sched.model_id,
+        "stages": sched.stages,
+        "source_path": sched.source_path,
+        "jitter_seconds": sched.jitter_seconds,
+        "enabled": bool(sched.enabled),
+        "next_run_at": sched.next_run_at.isoformat() if sched.next_run_at else None,
+        "last_run_at": sched.last_run_at.isoformat() if sched.last_run_at else None,
+    }
+
+def _next_run_time(cron: str, jitter_seconds: int, after: datetime) -> datetime:
+    return CronSchedule(cron).next_after(after) + timedelta(seconds=random.uniform(0, jitter_seconds or 0))
+
+def create_schedule(project_id: str, name: str, cron: str, dataset_id: str, model_id: Optional[str] = None, stages: Optional[list] = None, source_path: Optional[str] = None, jitter_seconds: Optional[int] = None, enabled: bool = True):
+    CronSchedule(cron)  # Raises ValueError on a malformed expression
+    stages = list(stages or PIPELINE_STAGES)
+    unknown = [s for s in stages if s not in PIPELINE_STAGES]
+    if unknown:
+        raise ValueError(f"Unsupported pipeline stages {unknown}. Expected a subset of {list(PIPELINE_STAGES)}")
+    if "scoring" in stages and not model_id:
+        raise ValueError("The scoring stage requires a model_id")
+    if "ingest" in stages and not source_path:
+        raise ValueError("The ingest stage requires a source_path")
+    if source_path:
+        _resolve_source_path(source_path)  # Raises ValueError outside the ingest directory
+    jitter_seconds = SCHEDULER_DEFAULT_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+    # Keep stages in pipeline order whatever order they were given in
+    stages = [s for s in PIPELINE_STAGES if s in stages]
+
+    db = SessionLocal()
+    try:
+        # A schedule may only train on and score its own project's dataset and model
+        if not db.query(DatasetRegistry.id).filter_by(id=dataset_id, project_id=project_id).first():
+            raise ValueError(f"Dataset {dataset_id} not found in project {project_id}")
+        if model_id and not db.query(TrainedModel.id).filter_by(id=model_id, project_id=project_id).first():
+            raise ValueError(f"Model {model_id} not found in project {project_id}")
+        sched = PipelineSchedule(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            name=name,
+            cron=cron,
+            dataset_id=dataset_id,
+            model_id=model_id,
+            stages=stages,
+            source_path=source_path,
+            jitter_seconds=jitter_seconds,
+            enabled=1 if enabled else 0,
+            next_run_at=_next_run_time(cron, jitter_seconds, datetime.utcnow()) if enabled else None,
+        )
+        db.add(sched)
+        db.commit()
+        return _schedule_to_dict(sched)
+    finally:
+        db.close()
+
+def list_schedules(project_id: str):
+    db = SessionLocal()
+    try:
+        return [_schedule_to_dict(s) for s in db.query(PipelineSchedule).filter_by(project_id=project_id).all()]
+    finally:
+        db.close()
+
+def delete_schedule(project_id: str, schedule_id: str):
+    db = SessionLocal()
+    try:
+        sched = db.query(PipelineSchedule).filter_by(id=schedule_id, project_id=project_id).first()
+        if not sched:
+            raise ValueError(f"Schedule {schedule_id} not found in project {project_id}")
+        db.query(PipelineRun).filter_by(schedule_id=schedule_id, project_id=project_id).delete()
+        db.delete(sched)
+        db.commit()
+        return {"status": "success", "message": f"Schedule {schedule_id} deleted."}
+    finally:
+        db.close()
+
+def list_schedule_runs(project_id: str, schedule_id: str, limit: int = 50):
+    db = SessionLocal()
+    try:
+        runs = db.query(PipelineRun).filter_by(schedule_id=schedule_id, project_id=project_id).order_by(PipelineRun.started_at.desc()).limit(limit).all()
+        return [
+            {
+                "id": r.id,
+                "schedule_id": r.schedule_id,
+                "status": r.status,
+                "stage_durations": r.stage_durations,
+                "details": r.details,
+                "error": r.error,
+                "started_at": r.started_at.isoformat() if r.started_at else None,
+                "finished_at": r.finished_at.isoformat() if r.finished_at else None,
+            }
+            for r in runs
+        ]
+    finally:
+        db.close()
+
+def _due_schedules(now: datetime) -> list:
+    db = SessionLocal()
+    try:
+        rows = db.query(PipelineSchedule.id).filter(
+            PipelineSchedule.enabled == 1, PipelineSchedule.next_run_at <= now
+        ).order_by(PipelineSchedule.next_run_at).all()
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+def _claim_schedule(schedule_id: str, now: datetime) -> bool:
+    """Advance next_run_at with a compare-and-set so only one worker process runs this slot."""
+    db = SessionLocal()
+    try:
+        sched = db.query(PipelineSchedule).filter_by(id=schedule_id).first()
+        if not sched or not sched.enabled or not sched.next_run_at or sched.next_run_at > now:
+            return False
+        claimed = db.query(PipelineSchedule).filter_by(id=schedule_id, next_run_at=sched.next_run_at).update(
+            {"next_run_at": _next_run_time(sched.cron, sched.jitter_seconds, now), "last_run_at": now},
+            synchronize_session=False,
+        )
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+def run_schedule(schedule_id: str) -> dict:
+    """Run a schedule's stages in order, recording each stage's duration on a PipelineRun."""
+    db = SessionLocal()
+    try:
+        sched = db.query(PipelineSchedule).filter_by(id=schedule_id).first()
+        if not sched:
+            raise ValueError(f"Schedule {schedule_id} not found")
+        run = PipelineRun(id=str(uuid.uuid4()), schedule_id=schedule_id, project_id=sched.project_id, status="running")
+        db.add(run)
+        db.commit()
+        run_id = run.id
+        sched_info = _schedule_to_dict(sched)
+    finally:
+        db.close()
+
+    durations, details, error = {}, {}, None
+    try:
+        rows_ingested = None
+        for stage in sched_info["stages"]:
+            started = time.perf_counter()
+            if stage == "ingest":
+                rows_ingested = ingest_incremental(sched_info["dataset_id"], sched_info["source_path"])
+                details[stage] = {"rows": rows_ingested}
+            elif stage == "feature_refresh":
+                if rows_ingested == 0 and get_engineered_version(sched_info["dataset_id"]) is not None:
+                    # Nothing new arrived: the engineered table is already current
+                    details[stage] = {"skipped": "no new rows"}
+                else:
+                    run_feature_engineering(sched_info["dataset_id"], sched_info["project_id"])
+                    details[stage] = {"version": get_engineered_version(sched_info["dataset_id"])}
+            elif stage == "scoring":
+                result = run_prediction(sched_info["model_id"], sched_info["dataset_id"], sched_info["project_id"])
+                details[stage] = {k: result.get(k) for k in ("prediction_id", "output_table", "rows_scored", "memoized")}
+            durations[stage] = time.perf_counter() - started
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Pipeline {schedule_id} failed: {e}", exc_info=True)
+
+    db = SessionLocal()
+    try:
+        run = db.query(PipelineRun).filter_by(id=run_id).first()
+        run.status = "failed" if error else "completed"
+        run.stage_durations = durations
+        run.details = details
+        run.error = error[:1000] if error else None
+        run.finished_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"Pipeline {sched_info['name']} ({schedule_id}) {run.status}: {durations}")
+        return {"run_id": run.id, "status": run.status, "stage_durations": durations, "details": details, "error": error}
+    finally:
+        db.close()
+
+scheduler = Scheduler(
+    _due_schedules,
+    _claim_schedule,
+    run_schedule,
+    max_concurrency=SCHEDULER_MAX_CONCURRENCY,
+    poll_seconds=SCHEDULER_POLL_SECONDS,
+)
+
+def trigger_schedule(project_id: str, schedule_id: str):
+    """Queue an immediate run of a schedule, outside its cron times."""
+    db = SessionLocal()
+    try:
+        if not db.query(PipelineSchedule).filter_by(id=schedule_id, project_id=project_id).first():
+            raise ValueError(f"Schedule {schedule_id} not found in project {project_id}")
+    finally:
+        db.close()
+    if not scheduler.submit(schedule_id):
+        return {"status": "running", "schedule_id": schedule_id}
+    return {"status": "queued", "schedule_id": schedule_id}
+
+
 # ==========================
 # COS Helper Functions
 # ==========================
 
+artifact_cache = DiskArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_BYTES)
+
+_cos_client = None
+_cos_client_lock = threading.Lock()
+
 def _get_cos_client():
-    """Create and return IBM COS S3 client"""
+    """
+    Return the process-wide IBM COS S3 client, creating it on first use.
+
+    The client is thread-safe and reused by every request, so its HTTP connection pool
+    and IAM token (refreshed by the SDK's token manager before it expires) are shared
+    instead of paying a TLS handshake and token exchange per call.
+    """
+    global _cos_client
+    if _cos_client is not None:
+        return _cos_client
     try:
         import ibm_boto3
         from ibm_botocore.client import Config
-        
-        client = ibm_boto3.client(
-            service_name="s3",
-            ibm_api_key_id=COS_API_KEY,
-            ibm_service_instance_id=COS_INSTANCE_CRN,
-            ibm_auth_endpoint="https://iam.cloud.ibm.com/identity/token",
-            config=Config(signature_version="oauth"),
-            endpoint_url=COS_S3_ENDPOINT,
-        )
-        return client
+
+        with _cos_client_lock:
+            if _cos_client is None and COS_HMAC_ACCESS_KEY_ID:
+                _cos_client = ibm_boto3.client(
+                    service_name="s3",
+                    aws_access_key_id=COS_HMAC_ACCESS_KEY_ID,
+                    aws_secret_access_key=COS_HMAC_SECRET_ACCESS_KEY,
+                    config=Config(signature_version="s3v4", max_pool_connections=COS_MAX_POOL_CONNECTIONS),
+                    endpoint_url=COS_S3_ENDPOINT,
+                )
+            elif _cos_client is None:
+                _cos_client = ibm_boto3.client(
+                    service_name="s3",
+                    ibm_api_key_id=COS_API_KEY,
+                    ibm_service_instance_id=COS_INSTANCE_CRN,
+                    ibm_auth_endpoint="https://iam.cloud.ibm.com/identity/token",
+                    config=Config(signature_version="oauth", max_pool_connections=COS_MAX_POOL_CONNECTIONS),
+                    endpoint_url=COS_S3_ENDPOINT,
+                )
+        return _cos_client
     except ImportError:
         logger.error("ibm_boto3 not installed. Install with: pip install ibm-cos-sdk")
         raise
@@ -828,71 +2259,92 @@ def _get_cos_client():
         logger.error(f"Failed to create COS client: {e}")
         raise
 
-def upload_model_to_cos(model: Any, model_id: str) -> Optional[str]:
+def _parse_cos_path(cos_path: str):
+    # Format: cos://bucket/key
+    if not cos_path.startswith("cos://"):
+        raise ValueError(f"Invalid COS path format: {cos_path}")
+    
+    path_parts = cos_path.replace("cos://", "").split("/", 1)
+    bucket = path_parts[0]
+    object_key = path_parts[1] if len(path_parts) > 1 else ""
+    return bucket, object_key
+
+def upload_model_to_cos(artifact_path: str, model_id: str, raise_errors: bool = False) -> Optional[str]:
     """
-    Upload trained model to IBM COS
+    Upload a saved model artifact (and its manifest, for native artifacts) to IBM COS
     
     Args:
-        model: Trained model object (XGBoost, sklearn, etc.)
+        artifact_path: Local artifact file (native `.ubj`/`.ubj.zst`/`.bundle.zip` or legacy `.pkl`)
         model_id: Unique identifier for the model
+        raise_errors: Re-raise upload errors instead of returning None
         
     Returns:
-        COS path (e.g., "cos://bucket/models/{model_id}.pkl") or None if failed
+        COS path (e.g., "cos://bucket/models/{model_id}.ubj.zst") or None if failed
     """
     try:
         s3 = _get_cos_client()
-        object_key = f"models/{model_id}.pkl"
+        object_key = f"models/{os.path.basename(artifact_path)}"
         
-        # Serialize model
-        binary_data = pickle.dumps(model)
+        # Native artifacts are read back together with their manifest
+        if not is_legacy_artifact(artifact_path):
+            cos_transfer.upload_file(s3, COS_BUCKET, manifest_path_for(object_key), manifest_path_for(artifact_path), content_type="application/json")
         
-        # Upload to COS
-        s3.put_object(
-            Bucket=COS_BUCKET,
-            Key=object_key,
-            Body=binary_data,
-            ContentType="application/octet-stream"
-        )
+        # Upload to COS (multipart and parallel above the configured threshold)
+        cos_transfer.upload_file(s3, COS_BUCKET, object_key, artifact_path)
         
         cos_path = f"cos://{COS_BUCKET}/{object_key}"
         logger.info(f"✅ Model uploaded to COS: {cos_path}")
+
+        # Seed the local cache so this node never downloads what it just uploaded
+        try:
+            cache_key = f"{COS_BUCKET}/{object_key}"
+            if not is_legacy_artifact(artifact_path):
+                artifact_cache.put_file(manifest_path_for(cache_key), manifest_path_for(artifact_path))
+            artifact_cache.put_file(cache_key, artifact_path)
+        except Exception as e:
+            logger.warning(f"Failed to seed local artifact cache for {cos_path}: {e}")
         
         return cos_path
         
     except Exception as e:
         logger.error(f"❌ Failed to upload model to COS: {e}")
+        if raise_errors:
+            raise
         return None
 
-def download_model_from_cos(cos_path: str) -> Optional[Any]:
+def _fetch_cos_object(bucket: str, object_key: str, sha256: Optional[str] = None) -> str:
+    """Local path of a COS object, served from the disk cache or streamed into it on a miss."""
+    def _download(f):
+        cos_transfer.download_fileobj(_get_cos_client(), bucket, object_key, f)
+        logger.info(f"Downloaded cos://{bucket}/{object_key} into the local artifact cache")
+
+    return artifact_cache.fetch(f"{bucket}/{object_key}", _download, sha256)
+
+def download_model_from_cos(cos_path: str, expected_sha256: Optional[str] = None) -> Optional[Any]:
     """
-    Download and deserialize model from IBM COS
+    Download and rebuild a model from IBM COS, through the local disk artifact cache
     
     Args:
-        cos_path: COS path (e.g., "cos://bucket/models/{model_id}.pkl")
+        cos_path: COS path (e.g., "cos://bucket/models/{model_id}.ubj.zst")
+        expected_sha256: Checksum recorded for the model; defaults to the one in its manifest
         
     Returns:
-        Deserialized model object or None if failed
+        Ready-to-predict model or None if failed. Legacy `.pkl` objects are unpickled.
     """
     try:
-        s3 = _get_cos_client()
-        
-        # Parse COS path
-        # Format: cos://bucket/key
-        if not cos_path.startswith("cos://"):
-            raise ValueError(f"Invalid COS path format: {cos_path}")
-        
-        path_parts = cos_path.replace("cos://", "").split("/", 1)
-        bucket = path_parts[0]
-        object_key = path_parts[1] if len(path_parts) > 1 else ""
-        
-        # Download from COS
-        response = s3.get_object(Bucket=bucket, Key=object_key)
-        binary_data = response['Body'].read()
+        bucket, object_key = _parse_cos_path(cos_path)
         
-        # Deserialize model
-        model = pickle.loads(binary_data)
+        # Rebuild model from the verified local copy
+        if is_legacy_artifact(object_key):
+            local_path = _fetch_cos_object(bucket, object_key, expected_sha256)
+            model = load_model_artifact(local_path)
+        else:
+            with open(_fetch_cos_object(bucket, manifest_path_for(object_key))) as f:
+                manifest = json.load(f)
+            local_path = _fetch_cos_object(bucket, object_key, expected_sha256 or manifest.get("sha256"))
+            model = load_model_artifact(local_path, verify=False)
         
-        logger.info(f"✅ Model downloaded from COS: {cos_path}")
+        logger.info(f"✅ Model loaded from COS: {cos_path}")
         return model
         
     except Exception as e:
@@ -918,17 +2370,12 @@ def delete_model_from_cos(cos_path: str) -> bool:
     """
     try:
         s3 = _get_cos_client()
-        
-        # Parse COS path
-        if not cos_path.startswith("cos://"):
-            raise ValueError(f"Invalid COS path format: {cos_path}")
-        
-        path_parts = cos_path.replace("cos://", "").split("/", 1)
-        bucket = path_parts[0]
-        object_key = path_parts[1] if len(path_parts) > 1 else ""
+        bucket, object_key = _parse_cos_path(cos_path)
         
         # Delete from COS
         s3.delete_object(Bucket=bucket, Key=object_key)
+        if not is_legacy_artifact(object_key):
+            s3.delete_object(Bucket=bucket, Key=manifest_path_for(object_key))
         
         logger.info(f"✅ Model deleted from COS: {cos_path}")
         return True
@@ -937,34 +2384,101 @@ def delete_model_from_cos(cos_path: str) -> bool:
         logger.error(f"❌ Failed to delete model from COS: {e}")
         return False
 
+def _resolve_upload_source(model_entry: TrainedModel) -> str:
+    """Local artifact to upload, checked against the model's recorded checksum."""
+    if not model_entry.artifact_path:
+        raise ValueError(f"Model {model_entry.id} has no recorded artifact")
+
+    # Artifacts trained on another node may only exist in this node's COS cache
+    source_path = model_entry.artifact_path
+    if not os.path.exists(source_path):
+        cache_key = f"{COS_BUCKET}/models/{os.path.basename(source_path)}"
+        source_path = artifact_cache.get(cache_key, model_entry.artifact_checksum)
+        if not source_path:
+            raise ValueError(f"Local model artifact not found at {model_entry.artifact_path}")
+
+    if model_entry.artifact_checksum and sha256_file(source_path) != model_entry.artifact_checksum:
+        raise ValueError("Local model artifact does not match its recorded checksum")
+    return source_path
+
+def _upload_model_job(model_id: str, attempt: int) -> None:
+    """One upload attempt, run on an upload queue worker. Raising schedules a retry."""
+    session = SessionLocal()
+    try:
+        model_entry = session.query(TrainedModel).filter_by(id=model_id).first()
+        if not model_entry:
+            logger.warning(f"Model {model_id} was deleted before its COS upload ran")
+            return
+        model_entry.upload_attempts = attempt
+        session.commit()
+
+        cos_path = upload_model_to_cos(_resolve_upload_source(model_entry), model_id, raise_errors=True)
+
+        model_entry.cos_path = cos_path
+        model_entry.upload_state = "uploaded"
+        model_entry.upload_error = None
+        session.commit()
+    finally:
+        session.close()
+
+def _mark_upload_failed(model_id: str, error: Exception, attempts: int) -> None:
+    session = SessionLocal()
+    try:
+        model_entry = session.query(TrainedModel).filter_by(id=model_id).first()
+        if model_entry:
+            model_entry.upload_state = "failed"
+            model_entry.upload_attempts = attempts
+            model_entry.upload_error = str(error)[:1000]
+            session.commit()
+    finally:
+        session.close()
+
+upload_queue = UploadQueue(
+    _upload_model_job,
+    _mark_upload_failed,
+    workers=COS_UPLOAD_WORKERS,
+    max_attempts=COS_UPLOAD_MAX_ATTEMPTS,
+    base_delay=COS_UPLOAD_BACKOFF_SECONDS,
+)
+
+def resume_pending_uploads() -> int:
+    """
+    Re-queue uploads left pending by a previous process. Called on startup only in the
+    SCHEDULER_ENABLED process, so each artifact is uploaded once however many workers run.
+    """
+    session = SessionLocal()
+    try:
+        model_ids = [m.id for m in session.query(TrainedModel.id).filter_by(upload_state="pending").all()]
+    finally:
+        session.close()
+    for model_id in model_ids:
+        upload_queue.enqueue(model_id)
+    if model_ids:
+        logger.info(f"Re-queued {len(model_ids)} pending COS uploads")
+    return len(model_ids)
+
 def upload_model_to_cos_manual(project_id: str, model_id: str):
     """
-    Manually upload a model to COS if it hasn't been uploaded yet or to retry.
+    Queue a COS upload for a model that hasn't been uploaded yet, or retry a failed one.
     """
     session = SessionLocal()
     try:
         model_entry = session.query(TrainedModel).filter_by(id=model_id, project_id=project_id).first()
         if not model_entry:
             raise ValueError(f"Model {model_id} not found in project {project_id}")
-            
-        if not model_entry.artifact_path or not os.path.exists(model_entry.artifact_path):
-             raise ValueError(f"Local model artifact not found at {model_entry.artifact_path}")
-             
-        # Load model logic to verify it works/exists
-        with open(model_entry.artifact_path, 'rb') as f:
-            model = pickle.load(f)
-            
-        # Upload
-        cos_path = upload_model_to_cos(model, model_id)
-        
-        if not cos_path:
-            raise ValueError("Failed to upload model to COS.")
-            
-        # Update DB
-        model_entry.cos_path = cos_path
+
+        if model_entry.cos_path and model_entry.upload_state in (None, "uploaded"):
+            return {"status": "uploaded", "cos_path": model_entry.cos_path}
+
+        # Fail fast on a missing artifact instead of burning retries on it
+        _resolve_upload_source(model_entry)
+
+        model_entry.upload_state = "pending"
+        model_entry.upload_error = None
         session.commit()
+        upload_queue.enqueue(model_id)
         
-        return {"status": "success", "cos_path": cos_path}
+        return {"status": "pending", "cos_path": None}
         
     except Exception as e:
         logger.error(f"Manual COS Upload Failed: {e}", exc_info=True)
@@ -0,0 +1,293 @@
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Feature Selection Strategies
+# ==========================
+# Every strategy scores candidate columns against the target only; nothing builds the
+# full feature-by-feature matrix. Per-column work is split into column blocks and run
+# on a thread pool (numpy, scikit-learn and XGBoost release the GIL in their kernels).
+#
+#   correlation       |Pearson r| with the target, pairwise-complete like DataFrame.corr
+#   mutual_info       k-NN mutual information, catches non-linear and non-monotonic links
+#   mrmr              mutual information relevance over mean |r| with already-picked
+#                     features, whose correlations are updated one pick at a time
+#   model_importance  gain importance from a quick XGBoost fit on all candidates
+
+SELECTION_STRATEGIES = ("correlation", "mutual_info", "mrmr", "model_importance")
+
+# Columns per block handed to a worker
+COLUMN_BLOCK_SIZE = 32
+# Mutual information is O(n log n) per column; larger tables are scored on a fixed sample
+MI_MAX_ROWS = 20_000
+# A numeric target with at most this many distinct integer values is treated as classes
+MAX_DISCRETE_CLASSES = 20
+
+
+def is_discrete_target(y: np.ndarray) -> bool:
+    y = y[~np.isnan(y)]
+    return bool(len(y)) and np.all(y == np.round(y)) and len(np.unique(y)) <= MAX_DISCRETE_CLASSES
+
+
+def _map_column_blocks(fn: Callable[[np.ndarray], np.ndarray], X: np.ndarray, workers: int) -> np.ndarray:
+    """Apply `fn` to column blocks of `X` in parallel and concatenate the per-column results."""
+    blocks = [slice(i, i + COLUMN_BLOCK_SIZE) for i in range(0, X.shape[1], COLUMN_BLOCK_SIZE)]
+    if workers <= 1 or len(blocks) == 1:
+        return np.concatenate([fn(X[:, b]) for b in blocks]) if blocks else np.empty(0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(lambda b: fn(X[:, b]), blocks)))
+
+
+def _corr_with_target(Xb: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson r of each column with `y`, over the rows where both are present."""
+    valid = ~np.isnan(Xb) & ~np.isnan(y)[:, None]
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx = np.where(valid, Xb, 0.0).sum(axis=0) / n
+        my = np.where(valid, y[:, None], 0.0).sum(axis=0) / n
+        xc = np.where(valid, Xb - mx, 0.0)
+        yc = np.where(valid, y[:, None] - my, 0.0)
+        r = (xc * yc).sum(axis=0) / np.sqrt((xc * xc).sum(axis=0) * (yc * yc).sum(axis=0))
+    r[n < 2] = np.nan
+    return r
+
+
+def target_correlation(X: np.ndarray, y: np.ndarray, workers: int = 1) -> np.ndarray:
+    return np.abs(_map_column_blocks(lambda Xb: _corr_with_target(Xb, y), X, workers))
+
+
+def _fill_missing(X: np.ndarray) -> np.ndarray:
+    """Column medians in place of NaN, for estimators that reject missing values."""
+    if not np.isnan(X).any():
+        return X
+    with np.errstate(all="ignore"):
+        medians = np.nan_to_num(np.nanmedian(X, axis=0))
+    return np.where(np.isnan(X), medians, X)
+
+
+def mutual_information(X: np.ndarray, y: np.ndarray, discrete: bool, workers: int = 1, random_state: int = 42) -> np.ndarray:
+    from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+
+    keep = ~np.isnan(y)
+    X, y = X[keep], y[keep]
+    if len(y) > MI_MAX_ROWS:
+        rows = np.random.default_rng(random_state).choice(len(y), MI_MAX_ROWS, replace=False)
+        X, y = X[rows], y[rows]
+    X = _fill_missing(X)
+    score = mutual_info_classif if discrete else mutual_info_regression
+    return _map_column_blocks(
+        lambda Xb: score(Xb, y, discrete_features=False, random_state=random_state), X, workers
+    )
+
+
+def mrmr(X: np.ndarray, relevance: np.ndarray, top_k: int) -> Tuple[List[int], np.ndarray]:
+    """
+    Greedy minimum-redundancy maximum-relevance ordering (quotient form).
+
+    Columns are standardized once; each pick adds its |r| against every remaining column
+    to a running redundancy sum, an O(n·p) matrix-vector product per pick, so picking k
+    features costs O(k·n·p) instead of the O(n·p²) full correlation matrix.
+    Returns the picked column indices and the score each had when it was picked.
+    """
+    n, p = X.shape
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(X, axis=0)
+        std = np.nanstd(X, axis=0)
+        Z = np.nan_to_num((X - mean) / (std * np.sqrt(n)))
+    relevance = np.nan_to_num(relevance, nan=-np.inf)
+    redundancy = np.zeros(p)
+    remaining = np.ones(p, dtype=bool)
+    picked, scores = [], np.full(p, np.nan)
+
+    for step in range(min(top_k, p)):
+        if step == 0:
+            candidate = relevance
+        else:
+            candidate = relevance / np.maximum(redundancy / step, 1e-12)
+        candidate = np.where(remaining, candidate, -np.inf)
+        best = int(np.argmax(candidate))
+        if not np.isfinite(candidate[best]):
+            break
+        picked.append(best)
+        scores[best] = candidate[best]
+        remaining[best] = False
+        redundancy += np.abs(Z.T @ Z[:, best])
+    return picked, scores
+
+
+def model_importance(X: np.ndarray, y: np.ndarray, discrete: bool, workers: int = 1) -> np.ndarray:
+    """Total gain per column from a shallow XGBoost fit; unused columns score zero."""
+    from backend.services.modeling import build_estimator
+
+    keep = ~np.isnan(y)
+    X, y = X[keep], y[keep]
+    params = {"n_estimators": 50, "max_depth": 4, "n_jobs": workers, "tree_method": "hist"}
+    if discrete:
+        # XGBoost wants class labels 0..K-1
+        _, y = np.unique(y, return_inverse=True)
+    model = build_estimator("classification" if discrete else "regression", params)
+    model.fit(X, y)
+    gain = model.get_booster().get_score(importance_type="total_gain")
+    return np.array([gain.get(f"f{i}", 0.0) for i in range(X.shape[1])])
+
+
+def select_features(frame: pd.DataFrame, target_column: str, top_k: int, strategy: str = "correlation", workers: int = 1) -> Tuple[List[str], Dict[str, Optional[float]]]:
+    """
+    Rank the numeric columns of `frame` against `target_column` with `strategy`.
+
+    Returns the `top_k` selected column names, best first, and every candidate's score
+    (None where a column could not be scored, e.g. a constant column).
+    """
+    if strategy not in SELECTION_STRATEGIES:
+        raise ValueError(f"Unsupported selection strategy '{strategy}'. Expected one of {list(SELECTION_STRATEGIES)}")
+    numeric = frame.select_dtypes(include=["number", "bool"])
+    if target_column not in numeric.columns:
+        raise ValueError(f"Target column '{target_column}' matches no numeric data for {strategy} scoring.")
+
+    names = [c for c in numeric.columns if c != target_column]
+    X = numeric[names].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = numeric[target_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    if not names:
+        return [], {}
+
+    if strategy == "correlation":
+        scores = target_correlation(X, y, workers)
+    elif strategy == "mutual_info":
+        scores = mutual_information(X, y, is_discrete_target(y), workers)
+    elif strategy == "mrmr":
+        relevance = mutual_information(X, y, is_discrete_target(y), workers)
+        picked, scores = mrmr(X, relevance, top_k)
+        selected = [names[i] for i in picked]
+        return selected, {c: (None if np.isnan(s) else float(s)) for c, s in zip(names, scores)}
+    else:
+        scores = model_importance(X, y, is_discrete_target(y), workers)
+
+    # Stable sort, best first, unscorable columns last
+    order = sorted(range(len(names)), key=lambda i: -scores[i] if not np.isnan(scores[i]) else np.inf)
+    selected = [names[i] for i in order[:top_k]]
+    return selected, {c: (None if np.isnan(s) else float(s)) for c, s in zip(names, scores)}
+
+
+# ==========================
+# Sampling
+# ==========================
+# Rankings are stable well before the full table is read, so very large tables can be
+# scored on a sample drawn while streaming chunks. Every row gets a uniform random key
+# and the sample is the rows with the smallest keys, overall (reservoir) or per stratum
+# (stratified); only the current sample plus one chunk is ever held in memory.
+# Stratified samples over-represent small strata on purpose, so statistics meant for the
+# whole table weight each row by its stratum's rows per sampled row.
+
+SAMPLING_MODES = ("stratified", "reservoir")
+# Strata smaller than this are kept whole; larger ones get at least this many rows
+MIN_ROWS_PER_STRATUM = 30
+
+
+def reservoir_sample(chunks: Iterable[pd.DataFrame], size: int, random_state: int = 42) -> Tuple[pd.DataFrame, int]:
+    """Uniform sample of `size` rows from a chunk stream. Returns (sample, rows seen)."""
+    rng = np.random.default_rng(random_state)
+    kept, seen = None, 0
+    for chunk in chunks:
+        seen += len(chunk)
+        chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+        kept = chunk if kept is None else pd.concat([kept, chunk], ignore_index=True)
+        if len(kept) > size:
+            kept = kept.nsmallest(size, "_sample_key")
+    if kept is None:
+        return pd.DataFrame(), 0
+    return kept.drop(columns="_sample_key").reset_index(drop=True), seen
+
+
+def allocate_strata(counts: pd.DataFrame, size: int) -> Optional[pd.DataFrame]:
+    """
+    Allocation of `size` rows over strata, given a `n_rows` column per stratum.
+    Every stratum first gets MIN_ROWS_PER_STRATUM rows (or all of them) so rare classes and
+    small device groups are still represented; the rest of `size` is shared in proportion
+    to the rows each stratum has left, so the takes sum to exactly `size` (or to every row
+    of a smaller table). Returns None when the minimums alone exceed `size`.
+    """
+    n_rows = counts["n_rows"].to_numpy(dtype=np.int64)
+    base = np.minimum(n_rows, MIN_ROWS_PER_STRATUM)
+    if base.sum() > size:
+        return None
+    spare = n_rows - base
+    remaining = min(size, int(n_rows.sum())) - int(base.sum())
+    extra = np.zeros(len(n_rows), dtype=np.int64)
+    if remaining > 0:
+        # Largest remainders get the rows that flooring leaves over
+        exact = spare * (remaining / spare.sum())
+        extra = np.floor(exact).astype(np.int64)
+        leftover = remaining - int(extra.sum())
+        extra[np.argsort(extra - exact, kind="stable")[:leftover]] += 1
+    return counts.assign(take=base + extra)
+
+
+def stratified_sample(chunks: Iterable[pd.DataFrame], strata_cols: List[str], allocation: pd.DataFrame, random_state: int = 42) -> pd.DataFrame:
+    """Per-stratum uniform sample from a chunk stream, `allocation.take` rows per stratum."""
+    rng = np.random.default_rng(random_state)
+    quota = allocation[strata_cols + ["take"]]
+    kept = None
+    for chunk in chunks:
+        chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+        combined = chunk if kept is None else pd.concat([kept, chunk], ignore_index=True)
+        combined = combined.sort_values("_sample_key", kind="stable", ignore_index=True)
+        take = combined[strata_cols].merge(quota, on=strata_cols, how="left")["take"].fillna(0).to_numpy()
+        rank = combined.groupby(strata_cols, sort=False, dropna=False).cumcount().to_numpy()
+        kept = combined[rank < take]
+    if kept is None:
+        return pd.DataFrame()
+    return kept.drop(columns="_sample_key").reset_index(drop=True)
+
+
+def stratum_weights(sample: pd.DataFrame, strata_cols: List[str], allocation: pd.DataFrame) -> np.ndarray:
+    """Per-row weight n_rows / take of a stratified sample: the table rows each sampled row stands for."""
+    weights = allocation[strata_cols].assign(_weight=allocation["n_rows"] / allocation["take"].where(allocation["take"] > 0))
+    return sample[strata_cols].merge(weights, on=strata_cols, how="left")["_weight"].to_numpy(dtype=np.float64)
+
+
+def _weighted_corr_with_target(X: np.ndarray, y: np.ndarray, w: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Weighted Pearson r of each column with `y` over pairwise-complete rows, and Kish's effective n."""
+    valid = ~np.isnan(X) & ~np.isnan(y)[:, None]
+    wv = np.where(valid, w[:, None], 0.0)
+    total = wv.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx = (wv * np.where(valid, X, 0.0)).sum(axis=0) / total
+        my = (wv * np.where(valid, y[:, None], 0.0)).sum(axis=0) / total
+        xc = np.where(valid, X - mx, 0.0)
+        yc = np.where(valid, y[:, None] - my, 0.0)
+        r = (wv * xc * yc).sum(axis=0) / np.sqrt((wv * xc * xc).sum(axis=0) * (wv * yc * yc).sum(axis=0))
+        n_eff = total ** 2 / (wv * wv).sum(axis=0)
+    r[valid.sum(axis=0) < 2] = np.nan
+    return r, np.nan_to_num(n_eff)
+
+
+def correlation_intervals(frame: pd.DataFrame, target_column: str, columns: List[str], confidence: float = 0.95, weights: Optional[np.ndarray] = None) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Pearson r of each column with the target and its Fisher-z confidence interval,
+    tanh(atanh(r) ± z / sqrt(n - 3)) over the n pairwise-complete rows. With `weights`
+    (see `stratum_weights`), r is the weighted correlation and n the effective sample size.
+    """
+    from scipy.stats import norm
+
+    X = frame[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = frame[target_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    if weights is None:
+        r = _corr_with_target(X, y)
+        n = (~np.isnan(X) & ~np.isnan(y)[:, None]).sum(axis=0)
+    else:
+        r, n = _weighted_corr_with_target(X, y, weights)
+    z_crit = norm.ppf(0.5 + confidence / 2)
+    intervals = {}
+    for col, r_i, n_i in zip(columns, r, n):
+        if np.isnan(r_i) or n_i <= 3:
+            intervals[col] = None
+            continue
+        z = np.arctanh(np.clip(r_i, -0.999999, 0.999999))
+        half = z_crit / np.sqrt(n_i - 3)
+        intervals[col] = {"r": float(r_i), "low": float(np.tanh(z - half)), "high": float(np.tanh(z + half)), "n": int(round(n_i))}
+    return intervals
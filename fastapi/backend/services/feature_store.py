@@ -0,0 +1,90 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# ==========================
+# Online Feature Store
+# ==========================
+# Latest engineered feature row per device, held as an immutable snapshot per dataset:
+# a compact frame (one row per device) plus a dict from device key to row position.
+# Device lookups are dict hits, and fleet-wide scoring reads the whole frame at once.
+# A refresh builds a new snapshot and swaps it in, so readers never take a lock.
+
+
+def _normalize_key_part(value) -> str:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # A column read back as float (e.g. with missing values) must match int keys: 5.0 == 5
+        value = int(value)
+    return str(value)
+
+
+def normalize_key(values: Sequence) -> Tuple[str, ...]:
+    """Device keys are compared as strings, whatever dtype the raw upload used."""
+    return tuple(_normalize_key_part(v) for v in values)
+
+
+def latest_rows(df: pd.DataFrame, key_cols: List[str], time_col: str = "Date") -> pd.DataFrame:
+    """Newest row per device key."""
+    if time_col in df.columns:
+        df = df.sort_values(time_col, kind="stable")
+    return df.groupby(key_cols, sort=False, dropna=False).tail(1).reset_index(drop=True)
+
+
+class FeatureSnapshot:
+    def __init__(self, frame: pd.DataFrame, key_cols: List[str], version: Optional[int]):
+        self.frame = frame.reset_index(drop=True)
+        self.version = version
+        keys = zip(*(self.frame[c].to_numpy() for c in key_cols)) if len(self.frame) else []
+        self.positions: Dict[Tuple[str, ...], int] = {normalize_key(k): i for i, k in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def lookup(self, keys: List[Tuple[str, ...]]) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Rows for `keys` in request order, and a mask of which keys were found."""
+        positions = [self.positions.get(k, -1) for k in keys]
+        found = np.array([p >= 0 for p in positions], dtype=bool)
+        if found.all():
+            return self.frame.take(positions).reset_index(drop=True), found
+        # Unknown devices keep their slot as an all-missing row
+        return self.frame.reindex(positions).reset_index(drop=True), found
+
+
+class LatestFeatureStore:
+    def __init__(self, key_cols: List[str], time_col: str = "Date"):
+        self.key_cols = key_cols
+        self.time_col = time_col
+        self._snapshots: Dict[str, FeatureSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def merge(self, current: Optional[pd.DataFrame], updates: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fold freshly engineered rows into the current latest-row frame. Devices missing
+        from `updates` keep their stored row; a stored row only loses to a newer one.
+        """
+        fresh = latest_rows(updates, self.key_cols, self.time_col)
+        if current is None or current.empty:
+            return fresh
+        combined = pd.concat([current, fresh], ignore_index=True)
+        return latest_rows(combined, self.key_cols, self.time_col)
+
+    def install(self, dataset_id: str, frame: pd.DataFrame, version: Optional[int]) -> FeatureSnapshot:
+        snapshot = FeatureSnapshot(frame, self.key_cols, version)
+        with self._lock:
+            self._snapshots[dataset_id] = snapshot
+        return snapshot
+
+    def get(self, dataset_id: str) -> Optional[FeatureSnapshot]:
+        return self._snapshots.get(dataset_id)
+
+    def invalidate(self, dataset_id: str) -> None:
+        with self._lock:
+            self._snapshots.pop(dataset_id, None)
+
+    def stats(self) -> Dict[str, Dict[str, Optional[int]]]:
+        return {ds: {"devices": len(s), "version": s.version} for ds, s in list(self._snapshots.items())}
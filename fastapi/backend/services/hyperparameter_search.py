@@ -0,0 +1,184 @@
+import time
+import logging
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.services.modeling import build_estimator, evaluate_predictions, score_metrics
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Search Space
+# ==========================
+
+# Used when a search request does not declare its own `param_space`.
+# Each entry is either a list of choices or a {"type", "low", "high", "log"} range.
+DEFAULT_PARAM_SPACE = {
+    "max_depth": {"type": "int", "low": 3, "high": 10},
+    "learning_rate": {"type": "float", "low": 0.01, "high": 0.3, "log": True},
+    "subsample": {"type": "float", "low": 0.5, "high": 1.0},
+    "colsample_bytree": {"type": "float", "low": 0.5, "high": 1.0},
+    "min_child_weight": {"type": "float", "low": 1.0, "high": 10.0, "log": True},
+}
+
+SEARCH_MODES = ("random", "halving")
+
+
+@dataclass
+class TrialResult:
+    trial_number: int
+    rung: int
+    params: Dict[str, Any]
+    n_estimators: int
+    best_iteration: Optional[int]
+    metrics: Dict[str, float]
+    score: float
+    duration_seconds: float
+    model: Any = field(default=None, repr=False)
+
+
+def _sample_value(spec: Any, rng: np.random.Generator):
+    if isinstance(spec, (list, tuple)):
+        return spec[int(rng.integers(len(spec)))]
+    if not isinstance(spec, dict):
+        # Scalar values are fixed parameters
+        return spec
+
+    low, high = spec["low"], spec["high"]
+    if spec.get("log"):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    if spec.get("type") == "int":
+        return int(round(value))
+    return value
+
+
+def sample_params(param_space: Dict[str, Any], n_trials: int, random_state: int = 42) -> List[Dict[str, Any]]:
+    """Draw `n_trials` random configurations from the declared parameter space."""
+    rng = np.random.default_rng(random_state)
+    return [
+        {name: _sample_value(spec, rng) for name, spec in param_space.items()}
+        for _ in range(n_trials)
+    ]
+
+
+# ==========================
+# Trial Execution
+# ==========================
+
+def _run_trial(trial_number, rung, params, task_type, X_fit, y_fit, X_val, y_val, n_estimators, early_stopping_rounds, random_state):
+    """Fit one candidate with early stopping on the validation split. Runs in a worker process."""
+    start = time.perf_counter()
+    model = build_estimator(task_type, {
+        **params,
+        "n_estimators": n_estimators,
+        "early_stopping_rounds": early_stopping_rounds,
+        "random_state": random_state,
+        # One thread per trial, parallelism comes from running trials side by side
+        "n_jobs": 1,
+    })
+    model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+    preds = model.predict(X_val)
+    metrics = evaluate_predictions(task_type, y_val, preds)
+
+    best_iteration = getattr(model, "best_iteration", None)
+    return TrialResult(
+        trial_number=trial_number,
+        rung=rung,
+        params=params,
+        n_estimators=n_estimators,
+        best_iteration=int(best_iteration) if best_iteration is not None else None,
+        metrics=metrics,
+        score=score_metrics(task_type, metrics),
+        duration_seconds=time.perf_counter() - start,
+        model=model,
+    )
+
+
+def _run_rung(candidates, rung, task_type, X_fit, y_fit, X_val, y_val, n_estimators, early_stopping_rounds, random_state, n_jobs):
+    from joblib import Parallel, delayed
+
+    return Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_run_trial)(
+            trial_number, rung, params, task_type,
+            X_fit, y_fit, X_val, y_val,
+            n_estimators, early_stopping_rounds, random_state,
+        )
+        for trial_number, params in candidates
+    )
+
+
+def run_search(
+    task_type: str,
+    X_fit,
+    y_fit,
+    X_val,
+    y_val,
+    mode: str = "random",
+    param_space: Optional[Dict[str, Any]] = None,
+    n_trials: int = 20,
+    max_estimators: int = 500,
+    early_stopping_rounds: int = 20,
+    eta: int = 3,
+    n_jobs: int = -1,
+    random_state: int = 42,
+):
+    """
+    Run a random or successive-halving search and return (best_trial, all_trials).
+
+    In "random" mode every sampled configuration is trained with `max_estimators`
+    boosting rounds. In "halving" mode all configurations start on a small round
+    budget and only the top 1/eta of each rung advance to a budget eta times larger,
+    until a single configuration remains or `max_estimators` is reached.
+    Early stopping on the validation split applies in both modes.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode '{mode}'. Expected one of {list(SEARCH_MODES)}")
+    if n_trials < 1:
+        raise ValueError("n_trials must be at least 1")
+    if mode == "halving" and eta < 2:
+        raise ValueError("eta must be at least 2")
+
+    configs = sample_params(param_space or DEFAULT_PARAM_SPACE, n_trials, random_state)
+    candidates = list(enumerate(configs))
+
+    if mode == "random":
+        budget = max_estimators
+    else:
+        # floor(log_eta(n_trials)) in integers, a float log drops a rung at exact powers
+        n_rungs = 0
+        while eta ** (n_rungs + 1) <= n_trials:
+            n_rungs += 1
+        budget = max(early_stopping_rounds + 1, max_estimators // (eta ** n_rungs))
+
+    trials: List[TrialResult] = []
+    rung = 0
+    while True:
+        rung_start = time.perf_counter()
+        results = _run_rung(
+            candidates, rung, task_type, X_fit, y_fit, X_val, y_val,
+            budget, early_stopping_rounds, random_state, n_jobs,
+        )
+        trials.extend(results)
+        logger.info(f"Search rung {rung}: {len(results)} trials with {budget} rounds in {time.perf_counter() - rung_start:.2f}s")
+
+        if mode == "random" or len(results) <= 1 or budget >= max_estimators:
+            break
+
+        ranked = sorted(results, key=lambda r: r.score, reverse=True)
+        survivors = ranked[:max(1, len(ranked) // eta)]
+        # Only the last rung's models can win, drop the rest to free memory
+        for r in results:
+            r.model = None
+        candidates = [(r.trial_number, r.params) for r in survivors]
+        budget = min(max_estimators, budget * eta)
+        rung += 1
+
+    final_rung = [t for t in trials if t.model is not None]
+    best = max(final_rung, key=lambda r: r.score)
+    for t in trials:
+        if t is not best:
+            t.model = None
+    return best, trials
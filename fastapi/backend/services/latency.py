@@ -0,0 +1,83 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+# ==========================
+# Latency Histograms
+# ==========================
+# Fixed-bucket histograms (milliseconds) for request stages. Recording is a bisect and
+# a counter increment under a lock, cheap enough for every online request.
+
+DEFAULT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)  # last bucket is +Inf
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        i = bisect.bisect_left(self.buckets_ms, ms)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    def quantile(self, q: float, counts: Optional[List[int]] = None) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (the max for the +Inf bucket)."""
+        counts = counts if counts is not None else list(self._counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self._max_ms
+        return self._max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, sum_ms, max_ms = list(self._counts), sum(self._counts), self._sum_ms, self._max_ms
+        return {
+            "count": total,
+            "mean_ms": sum_ms / total if total else None,
+            "max_ms": max_ms if total else None,
+            "p50_ms": self.quantile(0.5, counts),
+            "p95_ms": self.quantile(0.95, counts),
+            "p99_ms": self.quantile(0.99, counts),
+            "buckets": {**{f"le_{b}": c for b, c in zip(self.buckets_ms, counts)}, "le_inf": counts[-1]},
+        }
+
+
+class LatencyRegistry:
+    """Named histograms, created on first use."""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, LatencyHistogram())
+        return hist
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe((time.perf_counter() - start) * 1000.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = sorted(self._histograms)
+        return {name: self._histograms[name].snapshot() for name in names}
@@ -0,0 +1,111 @@
+import time
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.modeling import build_estimator, predict_with_model, to_float32_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def _as_key(key: Any) -> Tuple:
+    return key if isinstance(key, tuple) else (key,)
+
+
+class GroupedModelBundle:
+    """
+    One model per device group plus a global fallback, stored as a single artifact.
+
+    Rows are routed by their `group_cols` values. Each group is scored in one batch
+    against its own model, and rows from groups without a model (unseen, or too small
+    to train on) are scored together by the fallback model.
+    """
+
+    def __init__(self, task_type: str, features: List[str], group_cols: List[str], models: Dict[Tuple, Any], fallback: Any):
+        self.task_type = task_type
+        self.features = features
+        self.group_cols = group_cols
+        self.models = models
+        self.fallback = fallback
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        # Missing features count as 0, as for single models
+        X = to_float32_matrix(df.reindex(columns=self.features))
+        preds = np.empty(len(df), dtype=np.float64)
+        routed = np.zeros(len(df), dtype=bool)
+
+        if set(self.group_cols).issubset(df.columns):
+            groups = df.groupby(self.group_cols, sort=False, dropna=False).indices
+            for key, positions in groups.items():
+                model = self.models.get(_as_key(key))
+                if model is None:
+                    continue
+                preds[positions] = predict_with_model(model, X[positions], self.task_type)
+                routed[positions] = True
+
+        rest = np.flatnonzero(~routed)
+        if len(rest):
+            preds[rest] = predict_with_model(self.fallback, X[rest], self.task_type)
+
+        if self.task_type == 'classification':
+            return preds.astype(int)
+        return preds
+
+
+def _fit_group(key: Tuple, start: int, end: int, X: np.ndarray, y: np.ndarray, task_type: str, params: Dict[str, Any]):
+    """Train one group's model on its contiguous slice of the shared, group-sorted buffer."""
+    started = time.perf_counter()
+    model = build_estimator(task_type, {**params, "n_jobs": 1})
+    model.fit(X[start:end], y[start:end])
+    return key, model, end - start, time.perf_counter() - started
+
+
+def train_group_models(
+    task_type: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    codes: np.ndarray,
+    keys: List[Tuple],
+    min_group_rows: int = 50,
+    params: Optional[Dict[str, Any]] = None,
+    n_jobs: int = -1,
+) -> Tuple[Dict[Tuple, Any], Dict[str, Any]]:
+    """
+    Train one model per group code across a process pool.
+
+    `codes[i]` is the group of row i and `keys[code]` its group key. Rows are sorted
+    by code once so every group is a contiguous slice of one memory-mapped buffer.
+    Groups below `min_group_rows` (or with a single class, for classification) are
+    skipped and left to the fallback model. Returns (models, summary).
+    """
+    from joblib import Parallel, delayed
+
+    order = np.argsort(codes, kind="stable")
+    X_sorted, y_sorted, codes_sorted = X[order], y[order], codes[order]
+    group_codes, starts, counts = np.unique(codes_sorted, return_index=True, return_counts=True)
+
+    tasks, skipped = [], []
+    for code, start, count in zip(group_codes, starts, counts):
+        key = keys[code]
+        end = start + count
+        if count < min_group_rows or (task_type == 'classification' and len(np.unique(y_sorted[start:end])) < 2):
+            skipped.append(key)
+            continue
+        tasks.append((key, int(start), int(end)))
+
+    started = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs, backend="loky", mmap_mode="r")(
+        delayed(_fit_group)(key, start, end, X_sorted, y_sorted, task_type, params or {})
+        for key, start, end in tasks
+    )
+    logger.info(f"Trained {len(results)} group models in {time.perf_counter() - started:.2f}s, {len(skipped)} groups use the fallback")
+
+    models = {key: model for key, model, _, _ in results}
+    summary = {
+        "n_groups": len(group_codes),
+        "n_group_models": len(models),
+        "fallback_groups": [[str(v) for v in k] for k in skipped],
+        "group_train_seconds": sum(r[3] for r in results),
+    }
+    return models, summary
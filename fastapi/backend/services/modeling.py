@@ -0,0 +1,225 @@
+import os
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Estimator Defaults
+# ==========================
+
+# Hyperparameters used by `train_model` when no search is requested.
+DEFAULT_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "random_state": 42,
+}
+
+
+def build_estimator(task_type: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Build an XGBoost sklearn estimator for the given task type.
+
+    `params` is merged over DEFAULT_PARAMS so callers only pass what they override.
+    """
+    import xgboost as xgb
+
+    merged = {**DEFAULT_PARAMS, **(params or {})}
+    if task_type == 'classification':
+        merged.setdefault("eval_metric", "logloss")
+        return xgb.XGBClassifier(**merged)
+    return xgb.XGBRegressor(**merged)
+
+
+def evaluate_predictions(task_type: str, y_true, preds) -> Dict[str, float]:
+    """Compute the metric set reported for a model of the given task type."""
+    from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, r2_score, precision_score, recall_score, mean_absolute_error
+
+    metrics = {}
+    if task_type == 'classification':
+        metrics['accuracy'] = float(accuracy_score(y_true, preds))
+        metrics['f1'] = float(f1_score(y_true, preds, average='weighted'))
+        metrics['precision'] = float(precision_score(y_true, preds, average='weighted', zero_division=0))
+        metrics['recall'] = float(recall_score(y_true, preds, average='weighted', zero_division=0))
+    else:
+        metrics['rmse'] = float(np.sqrt(mean_squared_error(y_true, preds)))
+        metrics['mae'] = float(mean_absolute_error(y_true, preds))
+        metrics['r2'] = float(r2_score(y_true, preds))
+    return metrics
+
+
+def score_metrics(task_type: str, metrics: Dict[str, float]) -> float:
+    """Single higher-is-better score used to rank candidate models."""
+    if task_type == 'classification':
+        return metrics['f1']
+    return -metrics['rmse']
+
+
+def predict_with_model(model: Any, X, task_type: str):
+    """
+    Predict with either a sklearn-wrapped estimator or a native Booster from the fast path.
+    Boosters return class labels for classification, like the sklearn wrappers do.
+    """
+    import xgboost as xgb
+
+    if not isinstance(model, xgb.Booster):
+        return model.predict(X)
+
+    raw = model.inplace_predict(X)
+    if task_type != 'classification':
+        return raw
+    if raw.ndim == 2:
+        return raw.argmax(axis=1)
+    return (raw >= 0.5).astype(int)
+
+
+# ==========================
+# Native Training Fast Path
+# ==========================
+
+def booster_params(task_type: str, params: Optional[Dict[str, Any]] = None, n_classes: int = 2, nthread: Optional[int] = None, max_bin: int = 256) -> Dict[str, Any]:
+    """Translate the estimator defaults into `xgb.train` parameters for the `hist` tree method."""
+    merged = {**DEFAULT_PARAMS, **(params or {})}
+    merged.pop("n_estimators", None)
+    merged.pop("n_jobs", None)
+    seed = merged.pop("random_state", 42)
+
+    out = {
+        **merged,
+        "tree_method": "hist",
+        "max_bin": max_bin,
+        "seed": seed,
+        "nthread": nthread or os.cpu_count() or 1,
+    }
+    if task_type == 'classification':
+        if n_classes > 2:
+            out.update({"objective": "multi:softprob", "num_class": n_classes, "eval_metric": "mlogloss"})
+        else:
+            out.update({"objective": "binary:logistic", "eval_metric": "logloss"})
+    else:
+        out.setdefault("objective", "reg:squarederror")
+    return out
+
+
+def train_booster(task_type: str, X: np.ndarray, y: np.ndarray, feature_names: List[str], params: Optional[Dict[str, Any]] = None, nthread: Optional[int] = None, max_bin: int = 256):
+    """
+    Train a Booster from float32 NumPy buffers.
+
+    The QuantileDMatrix is built once and holds only the quantized bins, so XGBoost
+    never materialises its own float copy of the training data.
+    """
+    import xgboost as xgb
+
+    n_classes = int(np.max(y)) + 1 if task_type == 'classification' and len(y) else 2
+    train_params = booster_params(task_type, params, n_classes, nthread, max_bin)
+    dtrain = xgb.QuantileDMatrix(X, label=y, feature_names=feature_names, max_bin=max_bin, nthread=train_params["nthread"])
+    num_rounds = (params or {}).get("n_estimators", DEFAULT_PARAMS["n_estimators"])
+    return xgb.train(train_params, dtrain, num_boost_round=num_rounds)
+
+
+def train_booster_external_memory(
+    task_type: str,
+    chunk_factory: Callable[[], Iterable],
+    features: List[str],
+    target: str,
+    n_classes: int = 2,
+    params: Optional[Dict[str, Any]] = None,
+    nthread: Optional[int] = None,
+    max_bin: int = 256,
+    holdout_every: int = 5,
+    max_holdout_rows: int = 200_000,
+    holdout_key: Optional[List[str]] = None,
+):
+    """
+    Train a Booster from chunked reads when the feature table does not fit in RAM.
+
+    `chunk_factory` must return a fresh iterator of DataFrames on every call, because
+    XGBoost makes several passes over the data. About one row in `holdout_every` is held
+    out for evaluation (capped at `max_holdout_rows`), picked by a hash of its `holdout_key`
+    columns (all columns read by default), so the split does not depend on row order.
+    Returns (booster, X_holdout, y_holdout).
+    """
+    import xgboost as xgb
+
+    train_params = booster_params(task_type, params, n_classes, nthread, max_bin)
+    num_rounds = (params or {}).get("n_estimators", DEFAULT_PARAMS["n_estimators"])
+
+    with tempfile.TemporaryDirectory(prefix="xgb-extmem-") as cache_dir:
+        it = _FeatureChunkIter(chunk_factory, features, target, holdout_every, max_holdout_rows, holdout_key, os.path.join(cache_dir, "cache"))
+        if hasattr(xgb, "ExtMemQuantileDMatrix"):
+            dtrain = xgb.ExtMemQuantileDMatrix(it, max_bin=max_bin, nthread=train_params["nthread"])
+        else:
+            dtrain = xgb.DMatrix(it, nthread=train_params["nthread"])
+        booster = xgb.train(train_params, dtrain, num_boost_round=num_rounds)
+        # Release the paged matrix before its cache directory is removed
+        del dtrain
+
+    if it.holdout_X:
+        X_holdout, y_holdout = np.concatenate(it.holdout_X), np.concatenate(it.holdout_y)
+    else:
+        X_holdout, y_holdout = np.empty((0, len(features)), dtype=np.float32), np.empty(0)
+    return booster, X_holdout, y_holdout
+
+
+def to_float32_matrix(frame) -> np.ndarray:
+    """Contiguous float32 feature buffer with missing values set to 0, as `train_model` does."""
+    X = frame.to_numpy(dtype=np.float32)
+    if not X.flags.writeable:
+        # Copy-on-write pandas may hand back a read-only view of float32 data
+        X = X.copy()
+    X[np.isnan(X)] = 0
+    return X
+
+
+try:
+    import xgboost as _xgb
+    _DataIterBase = _xgb.DataIter
+except ImportError:  # xgboost is only required once training runs
+    _DataIterBase = object
+
+
+class _FeatureChunkIter(_DataIterBase):
+    """xgboost DataIter over chunked DataFrame reads, splitting off a holdout on the first pass."""
+
+    def __init__(self, chunk_factory, features, target, holdout_every, max_holdout_rows, holdout_key, cache_prefix):
+        self._chunk_factory = chunk_factory
+        self._features = features
+        self._target = target
+        self._holdout_every = holdout_every
+        self._max_holdout_rows = max_holdout_rows
+        self._holdout_key = holdout_key
+        self._chunks = None
+        self._first_pass = True
+        self.holdout_X: List[np.ndarray] = []
+        self.holdout_y: List[np.ndarray] = []
+        self._holdout_rows = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._chunks is None:
+            self._chunks = iter(self._chunk_factory())
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._first_pass = False
+            return False
+
+        X = to_float32_matrix(chunk[self._features])
+        y = chunk[self._target].to_numpy()
+        key = chunk[self._holdout_key] if self._holdout_key else chunk
+        is_holdout = pd.util.hash_pandas_object(key, index=False).to_numpy() % self._holdout_every == 0
+
+        if self._first_pass and self._holdout_rows < self._max_holdout_rows:
+            take = np.flatnonzero(is_holdout)[:self._max_holdout_rows - self._holdout_rows]
+            self.holdout_X.append(X[take])
+            self.holdout_y.append(y[take])
+            self._holdout_rows += len(take)
+
+        input_data(data=X[~is_holdout], label=y[~is_holdout], feature_names=self._features)
+        return True
+
+    def reset(self) -> None:
+        self._chunks = None
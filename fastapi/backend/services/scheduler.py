@@ -0,0 +1,175 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Cron Expressions
+# ==========================
+# Standard five fields: minute hour day-of-month month day-of-week (0 or 7 = Sunday).
+# Each field accepts `*`, numbers, lists (`1,15`), ranges (`1-5`) and steps (`*/15`, `8-18/2`).
+# As in cron, when both day fields are restricted a day matches either of them.
+
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_field(spec: str, name: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid step in cron {name} field: '{spec}'")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron {name} field '{spec}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got '{expression}'")
+        try:
+            fields = [_parse_field(p, name, lo, hi) for p, (name, lo, hi) in zip(parts, _FIELDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression '{expression}': {e}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {d % 7 for d in weekdays}
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months or not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+
+# ==========================
+# Scheduler
+# ==========================
+
+class Scheduler:
+    """
+    Polls for due schedules and runs them on a bounded thread pool.
+
+    `list_due(now)` returns ids of schedules whose next run time has passed, and
+    `claim(id, now)` must atomically advance that schedule's next run time, returning
+    False if another process got there first; only a successful claim runs `run(id)`.
+    A schedule already running in this process is never started twice.
+    """
+
+    def __init__(
+        self,
+        list_due: Callable[[datetime], List[str]],
+        claim: Callable[[str, datetime], bool],
+        run: Callable[[str], None],
+        max_concurrency: int = 2,
+        poll_seconds: float = 30.0,
+    ):
+        self._list_due = list_due
+        self._claim = claim
+        self._run = run
+        self.max_concurrency = max_concurrency
+        self.poll_seconds = poll_seconds
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="schedule")
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduler started (max {self.max_concurrency} concurrent runs, polling every {self.poll_seconds}s)")
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.poll_seconds)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._thread, self._pool = None, None
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return sorted(self._running)
+
+    def submit(self, schedule_id: str) -> bool:
+        """Run a schedule now on the pool. Returns False if it is already running here."""
+        with self._lock:
+            if schedule_id in self._running:
+                return False
+            self._running.add(schedule_id)
+        if self._pool is None:
+            # Not started (e.g. disabled): run on a one-off thread instead
+            threading.Thread(target=self._execute, args=(schedule_id,), daemon=True).start()
+        else:
+            self._pool.submit(self._execute, schedule_id)
+        return True
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Claim and submit every due schedule once. Returns how many were started."""
+        now = now or datetime.utcnow()
+        started = 0
+        for schedule_id in self._list_due(now):
+            with self._lock:
+                if schedule_id in self._running:
+                    continue
+            if self._claim(schedule_id, now) and self.submit(schedule_id):
+                started += 1
+        return started
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Scheduler tick failed: {e}", exc_info=True)
+            self._stop.wait(self.poll_seconds)
+
+    def _execute(self, schedule_id: str) -> None:
+        try:
+            self._run(schedule_id)
+        except Exception as e:
+            logger.error(f"Scheduled run of {schedule_id} failed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._running.discard(schedule_id)
@@ -0,0 +1,80 @@
+import json
+import datetime
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output with NaN written as null
+    orjson = None
+
+# ==========================
+# JSON Serialization
+# ==========================
+# One encoder for API payloads: orjson handles datetimes, dataclasses and NumPy arrays and
+# scalars natively, `_default` covers Decimal, pandas and the rest. NaN/inf become null,
+# as pandas-sourced previews carry them for missing values.
+#
+# Routes with a response_model already serialize straight to bytes through pydantic-core,
+# which only happens while the app keeps FastAPI's default response class. FastJSONResponse
+# is for untyped payloads: returned directly, it also skips jsonable_encoder.
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="ignore")
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def _replace_non_finite(obj: Any) -> Any:
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _replace_non_finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_non_finite(v) for v in obj]
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(_replace_non_finite(obj), default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Plain JSON types for `obj` (one encode and decode, both in C with orjson)."""
+    if orjson is not None:
+        return orjson.loads(dumps(obj))
+    return json.loads(dumps(obj))
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
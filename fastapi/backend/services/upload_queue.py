@@ -0,0 +1,98 @@
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==========================
+# Background Upload Queue
+# ==========================
+# Model uploads run on daemon worker threads so a request never waits on COS. A job
+# that raises is retried with exponential backoff (plus jitter) up to `max_attempts`;
+# `on_failure` is called once the last attempt has failed.
+
+
+class UploadQueue:
+    def __init__(
+        self,
+        job: Callable[[str, int], None],
+        on_failure: Callable[[str, Exception, int], None],
+        workers: int = 2,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+    ):
+        self._job = job
+        self._on_failure = on_failure
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._queued = set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"cos-upload-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def enqueue(self, model_id: str) -> bool:
+        """Queue an upload. Returns False if the model is already queued or in flight."""
+        with self._lock:
+            if model_id in self._queued:
+                return False
+            self._queued.add(model_id)
+        self.start()
+        self._queue.put((model_id, 1, 0.0))
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued or in flight (used by shutdown and scripts)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            model_id, attempt, not_before = self._queue.get()
+            wait = not_before - time.monotonic()
+            if wait > 0:
+                # Not due yet: put it back and let this worker pick up other jobs
+                self._queue.put((model_id, attempt, not_before))
+                time.sleep(min(wait, 0.5))
+                continue
+            try:
+                self._job(model_id, attempt)
+            except Exception as e:
+                if attempt < self.max_attempts:
+                    delay = self.backoff(attempt)
+                    logger.warning(f"Upload of model {model_id} failed (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s: {e}")
+                    self._queue.put((model_id, attempt + 1, time.monotonic() + delay))
+                    continue
+                logger.error(f"Upload of model {model_id} failed after {attempt} attempts: {e}")
+                try:
+                    self._on_failure(model_id, e, attempt)
+                except Exception as cb_error:
+                    logger.error(f"Failed to record upload failure for model {model_id}: {cb_error}")
+            with self._lock:
+                self._queued.discard(model_id)
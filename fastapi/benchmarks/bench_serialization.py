@@ -0,0 +1,151 @@
+"""
+Serialization benchmark for large preview payloads.
+
+Compares the stdlib path (jsonable_encoder + json.dumps) with backend.services.serialization,
+then times the same payload end to end through three kinds of FastAPI route, and the
+encode/decode round trip the StatsCalculator tools apply to their results.
+
+    python fastapi/benchmarks/bench_serialization.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from backend.services import serialization  # noqa: E402
+
+
+class PreviewRow(BaseModel):
+    Type: str
+    Application: str
+    IP: str
+    Date: datetime
+    prediction: int
+    probability: Optional[float]
+
+
+def build_preview(rows: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "Type": rng.choice(["server", "switch", "storage"], rows),
+        "Application": rng.choice(["billing", "crm", "erp", "web"], rows),
+        "IP": [f"10.0.{i // 256 % 256}.{i % 256}" for i in range(rows)],
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24, rows), unit="h"),
+        "prediction": rng.integers(0, 2, rows),
+        "probability": rng.random(rows),
+    })
+    frame.loc[frame.sample(frac=0.01, random_state=0).index, "probability"] = np.nan
+    records = frame.to_dict(orient="records")
+    for r in records:
+        r["Date"] = r["Date"].to_pydatetime()
+        r["probability"] = None if pd.isna(r["probability"]) else r["probability"]
+    return records
+
+
+def build_tool_result(rows: int) -> Dict[str, Any]:
+    """Shape of a get_column_data_v2 page: datetimes and Decimals straight from the driver."""
+    start = datetime(2024, 1, 1)
+    return {
+        "query_info": {"host_id": 5, "gap_days": [7], "limit": rows},
+        "rows": [
+            {
+                "hostname": f"Host {i % 20}",
+                "datetime_1": start + timedelta(hours=i),
+                "datetime_2": start + timedelta(days=7, hours=i),
+                "cpu_usage_percentage_avg": Decimal("37.2908333"),
+                "memory_usage_percentage_avg": Decimal("61.5"),
+            }
+            for i in range(rows)
+        ],
+        "row_count": rows,
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def tool_stdlib(result):
+    def serialize(obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return float(obj)
+        raise TypeError(f"Type {type(obj)} not serializable")
+    return json.loads(json.dumps(result, default=serialize))
+
+
+def tool_fast(result):
+    return serialization.to_jsonable(result)
+
+
+def build_app(preview: List[Dict[str, Any]]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/typed", response_model=List[PreviewRow])
+    def typed():
+        return preview
+
+    @app.get("/untyped")
+    def untyped():
+        return preview
+
+    @app.get("/untyped-fast")
+    def untyped_fast():
+        return serialization.FastJSONResponse(preview)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--tool-rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = "orjson" if serialization.orjson is not None else "stdlib fallback"
+    print(f"serialization backend: {backend}, {args.rows} preview rows, best of {args.repeat}")
+
+    preview = build_preview(args.rows)
+    results = {
+        "encode stdlib (jsonable_encoder + json.dumps)": timed(lambda: json.dumps(jsonable_encoder(preview)), args.repeat),
+        "encode serialization.dumps": timed(lambda: serialization.dumps(preview), args.repeat),
+    }
+
+    client = TestClient(build_app(preview))
+    for route in ("/typed", "/untyped", "/untyped-fast"):
+        assert client.get(route).status_code == 200
+        results[f"GET {route}"] = timed(lambda: client.get(route), args.repeat)
+
+    tool_result = build_tool_result(args.tool_rows)
+    assert tool_stdlib(tool_result) == tool_fast(tool_result)
+    results[f"tool round trip stdlib ({args.tool_rows} rows)"] = timed(lambda: tool_stdlib(tool_result), args.repeat * 20)
+    results[f"tool round trip serialization ({args.tool_rows} rows)"] = timed(lambda: tool_fast(tool_result), args.repeat * 20)
+
+    width = max(len(k) for k in results)
+    for name, seconds in results.items():
+        print(f"{name:<{width}}  {seconds * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from backend.services import data_service
+from backend.services.model_bundle import GroupedModelBundle
+from backend.services.modeling import build_estimator
+
+
+def _fan_out_model():
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 2), dtype=np.float32)
+    y = X[:, 0] * 10 + X[:, 1]
+    params = {"n_estimators": 5, "max_depth": 2}
+    models = {("A",): build_estimator("regression", params).fit(X[:100], y[:100])}
+    fallback = build_estimator("regression", params).fit(X, y)
+    return GroupedModelBundle("regression", ["f1", "f2"], ["Type"], models, fallback)
+
+
+def test_score_online_fan_out_missing_feature_counts_as_zero():
+    bundle = _fan_out_model()
+    handle = data_service.ServingModel(
+        model_id="m-fan-out", dataset_id="d", task_type="regression",
+        target_column="y", features=bundle.features, model=bundle,
+    )
+    data_service.serving_cache.put(("p-test", "m-fan-out"), handle)
+    try:
+        partial = data_service.score_online("p-test", "m-fan-out", instances=[{"Type": "A", "f1": 0.5}])
+        explicit = data_service.score_online("p-test", "m-fan-out", instances=[{"Type": "A", "f1": 0.5, "f2": 0}])
+    finally:
+        data_service.serving_cache.invalidate(lambda key: key == ("p-test", "m-fan-out"))
+
+    assert partial["predictions"][0]["prediction"] == explicit["predictions"][0]["prediction"]